@@ -0,0 +1,24 @@
+import random
+import timeit
+
+import sympy
+
+from fields.utils import INVERSION_METHODS
+from fields.primeorder import FiniteFieldPrimeOrder
+
+
+if __name__ == '__main__':
+    n_inversions = 500
+    for bits in [16, 64, 256, 1024]:
+        p = sympy.nextprime(2 ** bits + random.randrange(2 ** (bits - 1)))
+        values = [random.randrange(1, p) for _ in range(n_inversions)]
+        print(f'Inverting {n_inversions} values modulo a {bits}-bit prime:')
+        for name, inverse_mod in INVERSION_METHODS.items():
+            assert all(v * inverse_mod(v, p) % p == 1 for v in values)
+            seconds = timeit.timeit(lambda: [inverse_mod(v, p) for v in values], number=3) / 3
+            print(f'    {name:>6} (integers)       -> {1e6 * seconds / n_inversions:8.2f} µs per inversion')
+        for name in INVERSION_METHODS:
+            field = FiniteFieldPrimeOrder(prime=p, inversion=name)
+            elements = [field.from_coefficients(v) for v in values]
+            seconds = timeit.timeit(lambda: [1 / e for e in elements], number=3) / 3
+            print(f'    {name:>6} (field elements) -> {1e6 * seconds / n_inversions:8.2f} µs per inversion')
@@ -1,11 +1,12 @@
+import functools
 import random
 
 import sympy
 
+from bgn.params import find_point_order_n, find_smallest_p
 from curves.curves import WeierstrassCurve
 from curves.finitegroup import FiniteGroup
-from curves.weil import weil_pairing
-from fields.utils import bezout_identity_Z
+from curves.weil import PairingPrecomputation, tate_pairing, weil_pairing
 from fields.extension import FiniteFieldExtension3thPrimitiveRoot
 from fields.primeorder import FiniteFieldPrimeOrder
 
@@ -22,79 +23,130 @@ def keygen(bits_of_security):
     field_Fp = FiniteFieldPrimeOrder(prime=p)
     # Find g, u random generators in G.
     curve_Fp = WeierstrassCurve(a=0, b=1, field=field_Fp)
-    g = find_point_order_n(curve_Fp, q1, q2, p)
+    g = find_point_order_n(curve_Fp, q1, q2, p).precompute()    # g is a fixed base for all later multiplications
     u = g * random.randint(1, q1*q2-1)
     netrual_element = curve_Fp.neutral_element()
     while q1 * u == netrual_element or q2 * u == netrual_element:
         u = random.randint(1, p-1) * g
     # Find h
     h = q2 * u
-    # Define modified weil pairing
+    # Define modified (reduced) Tate pairing
     field_Fp2 = FiniteFieldExtension3thPrimitiveRoot(prime=p)
-    curve_Fp2 = WeierstrassCurve(a=0, b=1, field=field_Fp2)
-    S = curve_Fp2.point(x=field_Fp2.from_coefficients(0), y=field_Fp2.from_coefficients(1))
-    def e(P, Q):
-        return modified_weil_pairing(curve_Fp2, P, Q, n, S=S)
-    # Compute G1 (from weil pairing)
-    G1_gen = e(g, u)
-    G1_elements = [field_Fp2.from_coefficients(1)]
-    for i in range(1, n):
-        G1_elements.append(G1_gen ** i)
-    G1 = FiniteGroup(
-        group_elements=G1_elements,
-        identity_element=1,
-        operation=lambda a, b: a * b,
-        inverse=lambda a: 1 / a,
-    )
-    # Return private key and secret key
-    pk = (n, curve_Fp, G1, e, g, h)
+    e = _pairing_function(curve_Fp, field_Fp2, n)
+    g_pairing = e(g, g)
+    assert g_pairing ** q1 != 1 and g_pairing ** q2 != 1, f'e(g, g) does not have order {n=} (for {p=}).'
+    # Return private key and secret key (G1 is generated by the pairing value e(g, u), of order n)
+    pk = PublicKey(n, g, h, G1_generator=e(g, u), e=e)
     sk = (q1, )
     return pk, sk
 
 
+class PublicKey:
+    """ BGN public key, which unpacks as the tuple (n, curve_Fp, G1, e, g, h).
+
+    The pairing e and the group G1 are rebuilt from n, the curve and the generator of G1, so that keys can be pickled,
+    and serialized with to_bytes (n and p with their lengths, then g and h compressed, and the generator of G1).
+    """
+    def __init__(self, n, g, h, G1_generator, e=None):
+        self.n = n
+        self.curve = g.curve
+        self.g = g
+        self.h = h
+        self.e = _pairing_function(self.curve, G1_generator.field, n) if e is None else e
+        # G1 elements are never stored
+        self.G1 = FiniteGroup.cyclic(
+            generator=G1_generator,
+            order=n,
+            identity_element=G1_generator.field.one,
+            operation=lambda a, b: a * b,
+            inverse=lambda a: 1 / a,
+        )
+
+    def __iter__(self):
+        return iter((self.n, self.curve, self.G1, self.e, self.g, self.h))
+
+    def __getitem__(self, index):
+        return tuple(self)[index]
+
+    def __len__(self):
+        return 6
+
+    def to_bytes(self):
+        n_bytes = self.n.to_bytes((self.n.bit_length() + 7) // 8, 'big')
+        p = self.curve.field.prime
+        p_bytes = p.to_bytes((p.bit_length() + 7) // 8, 'big')
+        return b''.join([
+            len(n_bytes).to_bytes(2, 'big'), n_bytes,
+            len(p_bytes).to_bytes(2, 'big'), p_bytes,
+            self.g.to_bytes(compressed=True),
+            self.h.to_bytes(compressed=True),
+            self.G1.generator.to_bytes(),
+        ])
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = memoryview(data)
+        n_length = int.from_bytes(data[:2], 'big')
+        n = int.from_bytes(data[2:2 + n_length], 'big')
+        data = data[2 + n_length:]
+        p_length = int.from_bytes(data[:2], 'big')
+        p = int.from_bytes(data[2:2 + p_length], 'big')
+        data = data[2 + p_length:]
+        curve_Fp = WeierstrassCurve(a=0, b=1, field=FiniteFieldPrimeOrder(prime=p))
+        field_Fp2 = FiniteFieldExtension3thPrimitiveRoot(prime=p)
+        point_size = curve_Fp.point_size(compressed=True)
+        if len(data) != 2 * point_size + field_Fp2.element_size():
+            raise ValueError(f'Unexpected length of the encoding of a public key, for {n=} and {p=}.')
+        g = curve_Fp.point_from_bytes(data[:point_size], compressed=True).precompute()
+        h = curve_Fp.point_from_bytes(data[point_size:2 * point_size], compressed=True)
+        return cls(n, g, h, G1_generator=field_Fp2.from_bytes(data[2 * point_size:]))
+
+    def __reduce__(self):
+        return PublicKey.from_bytes, (self.to_bytes(), )
+
+    def __repr__(self):
+        return f'PublicKey(n={self.n}, curve={self.curve}, g={self.g}, h={self.h}, G1={self.G1})'
+
+
+def _pairing_function(curve_Fp, field_Fp2, n):
+    """ Modified (reduced) Tate pairing e(P, Q) of points of y^2 = x^3 + 1 over F_p, with values in field_Fp2. """
+    curve_Fp2 = WeierstrassCurve(a=0, b=1, field=field_Fp2)
+
+    @functools.lru_cache(maxsize=16)
+    def precomputation(P):     # Reuse Miller loop lines for repeated first arguments
+        return modified_tate_precomputation(curve_Fp2, P, n)
+
+    def e(P, Q):
+        return precomputation(P).tate_pairing(_distortion_map(curve_Fp2, Q))
+    return e
+
+
 def modified_weil_pairing(curve_Fp2, P, Q, n, S=None):
+    return weil_pairing(_cast_into_Fp2(curve_Fp2, P), _distortion_map(curve_Fp2, Q), n, S)
+
+
+def modified_tate_pairing(curve_Fp2, P, Q, n):
+    return tate_pairing(_cast_into_Fp2(curve_Fp2, P), _distortion_map(curve_Fp2, Q), n)
+
+
+def modified_tate_precomputation(curve_Fp2, P, n):
+    """ Precomputation for modified_tate_pairing(curve_Fp2, P, ·, n): evaluate with .tate_pairing(distorted Q). """
+    return PairingPrecomputation(_cast_into_Fp2(curve_Fp2, P), n)
+
+
+def _cast_into_Fp2(curve_Fp2, P):
     assert curve_Fp2.a == 0 and curve_Fp2.b == 1, 'Implementation only for y^2 = x^3 + 1 due to distortion map.'
     Fp2 = curve_Fp2.field
-    # Cast points into Fp2
-    P_Fp2 = curve_Fp2.point(
+    return curve_Fp2.point(
         x=Fp2.from_coefficients(P.x.coefficients[0]) if P.x is not None else None,
         y=Fp2.from_coefficients(P.y.coefficients[0]) if P.y is not None else None
     )
-    Q_Fp2_distorted = curve_Fp2.point(
+
+
+def _distortion_map(curve_Fp2, Q):
+    assert curve_Fp2.a == 0 and curve_Fp2.b == 1, 'Implementation only for y^2 = x^3 + 1 due to distortion map.'
+    Fp2 = curve_Fp2.field
+    return curve_Fp2.point(
         x=Fp2.from_coefficients(0, Q.x.coefficients[0]) if Q.x is not None else None,    # Applying distortion map: (x, y) -> (x · alpha, y)
         y=Fp2.from_coefficients(Q.y.coefficients[0]) if Q.y is not None else None
     )
-    # Compute
-    return weil_pairing(P_Fp2, Q_Fp2_distorted, n, S)
-
-
-def find_smallest_p(q_1, q_2):
-    n = q_1 * q_2
-    k = 0
-    while True:
-        k += 1
-        p = n*k - 1
-        if p < 5:
-            pass
-        elif not sympy.isprime(p):
-            pass
-        elif p % 3 != 2:
-            pass
-        else:
-            return p
-
-
-def find_point_order_n(curve, q1, q2, p):
-    assert curve.field.prime % 3 == 2, 'Implementation only for p = 2 (mod 3).'
-    assert curve.a == 0 and curve.b == 1, 'Implementation only for y^2 = x^3 + 1.'
-    neutral_element = curve.neutral_element()
-    for y_int in range(p):
-        y = curve.field.from_coefficients(y_int)
-        x_cube = y ** 2 - 1
-        # x^3 can be computed as (x^3)^e, where e = 1/3 (mod p-1)
-        alpha, _, _ = bezout_identity_Z(3, p - 1)
-        x = x_cube ** (alpha % (p-1))
-        P = curve.point(x=x, y=y)
-        if (q1*q2) * P == neutral_element and q1 * P != neutral_element and q2 * P != neutral_element:
-            return P
-    raise ValueError(f'Could not find a point of order {q1*q2} in curve {curve}.')
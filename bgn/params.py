@@ -0,0 +1,71 @@
+import random
+
+import sympy
+
+from fields.utils import bezout_identity_Z
+
+SIEVE_PRIMES = list(sympy.primerange(5, 2 ** 10))   # Small primes discarding candidates before primality tests
+SIEVE_BLOCK = 2 ** 12                               # Number of candidates k sieved at once
+
+
+def find_smallest_p(q_1, q_2):
+    """ Smallest prime p = k·n - 1 (for n = q_1·q_2 and k >= 1) such that p >= 5, p = 2 (mod 3), and neither q_1 nor
+    q_2 divide k.
+
+    The last condition keeps the reduced Tate pairing e(g, g) of order n: if q_i divided (p+1)/n, the q_i-component of
+    e(g, g) would be lost (to the final exponentiation by (p^2-1)/n).
+
+    The multipliers k are sieved by blocks before testing primality: small primes r (not dividing n) divide k·n - 1
+    exactly when k = n^(-1) (mod r), and p = 2 (mod 3) iff 3 divides k·n.
+    """
+    n = q_1 * q_2
+    # Candidates below the sieving primes could be one of them: test them directly
+    k = 1
+    while n * k - 1 <= SIEVE_PRIMES[-1]:
+        p = n * k - 1
+        if p >= 5 and p % 3 == 2 and k % q_1 != 0 and k % q_2 != 0 and sympy.isprime(p):
+            return p
+        k += 1
+    excluded = {r: pow(n, -1, r) for r in SIEVE_PRIMES if n % r != 0}   # {r: k (mod r) such that r | k·n - 1}
+    start = k
+    while True:
+        # candidates[i] != 0 iff k = start + i survives the sieve
+        candidates = bytearray([1]) * SIEVE_BLOCK
+        if n % 3 != 0:
+            for residue in (1, 2):
+                first = (residue - start) % 3
+                candidates[first::3] = bytes(len(range(first, SIEVE_BLOCK, 3)))
+        for q in (q_1, q_2):
+            first = (-start) % q
+            candidates[first::q] = bytes(len(range(first, SIEVE_BLOCK, q)))
+        for r, k_r in excluded.items():
+            first = (k_r - start) % r
+            candidates[first::r] = bytes(len(range(first, SIEVE_BLOCK, r)))
+        for i, candidate in enumerate(candidates):
+            if candidate and sympy.isprime(n * (start + i) - 1):
+                return n * (start + i) - 1
+        start += SIEVE_BLOCK
+
+
+def find_point_order_n(curve, q1, q2, p):
+    """ Point of order n = q1·q2 of y^2 = x^3 + 1 over F_p, for p = 2 (mod 3) and n dividing p + 1.
+
+    The curve has p + 1 points, so ((p+1)/n)·R has order dividing n for any point R; it is the result if neither q1·P
+    nor q2·P are the point at infinity.
+    """
+    assert curve.field.prime % 3 == 2, 'Implementation only for p = 2 (mod 3).'
+    assert curve.a == 0 and curve.b == 1, 'Implementation only for y^2 = x^3 + 1.'
+    n = q1 * q2
+    if (p + 1) % n != 0:
+        raise ValueError(f'{n=} does not divide the number of points of {curve} (p + 1 = {p + 1}).')
+    neutral_element = curve.neutral_element()
+    # x^3 can be computed as (x^3)^e, where e = 1/3 (mod p-1)
+    alpha, _, _ = bezout_identity_Z(3, p - 1)
+    cube_root_exponent = alpha % (p - 1)
+    for _ in range(64):
+        y = curve.field.from_coefficients(random.randrange(p))
+        x = (y * y - 1) ** cube_root_exponent
+        P = ((p + 1) // n) * curve.point(x=x, y=y, check_belongs=False)
+        if q1 * P != neutral_element and q2 * P != neutral_element:
+            return P
+    raise ValueError(f'Could not find a point of order {n} in curve {curve}.')
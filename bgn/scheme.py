@@ -0,0 +1,141 @@
+import functools
+import math
+import random
+
+from curves.curves import WeierstrassCurve
+
+MESSAGE_BOUND = 2 ** 20     # Messages are integers in [0, MESSAGE_BOUND), as decryption takes a discrete logarithm
+
+
+def encrypt(pk, m, r=None):
+    """ Ciphertext C = m·g + r·h in G (the curve), for a random r unless given. """
+    n, _, _, _, g, _ = pk
+    r = random.randrange(n) if r is None else r
+    return g * m + _precomputed(pk).h * r
+
+
+def encrypt_batch(pk, messages):
+    """ Ciphertexts of all messages, sharing the fixed-base tables of g and h, and a single field inversion to get
+    affine coordinates. """
+    n, curve, _, _, g, _ = pk
+    h = _precomputed(pk).h
+    return curve.batch_normalize([g * m + h * random.randrange(n) for m in messages])
+
+
+def add(pk, C1, C2):
+    """ Ciphertext of m1 + m2 (mod n), given ciphertexts of m1 and m2 both in G or both in G1 (re-randomized). """
+    n = pk[0]
+    if isinstance(C1, WeierstrassCurve.Point):
+        return C1 + C2 + _precomputed(pk).h * random.randrange(n)
+    return C1 * C2 * _precomputed(pk).h1_power(random.randrange(n))
+
+
+def multiply(pk, C1, C2):
+    """ Ciphertext in G1 of m1·m2 (mod n), given ciphertexts of m1 and m2 in G: e(C1, C2)·e(g, h)^r. """
+    n, _, _, e, _, _ = pk
+    return e(C1, C2) * _precomputed(pk).h1_power(random.randrange(n))
+
+
+def multiply_batch(pk, pairs):
+    """ Ciphertexts in G1 of m1·m2 (mod n), for each pair of ciphertexts in G (pairs with the same first ciphertext
+    share its Miller loop). """
+    n, _, _, e, _, _ = pk
+    precomputation = _precomputed(pk)
+    return [e(C1, C2) * precomputation.h1_power(random.randrange(n)) for C1, C2 in pairs]
+
+
+def decrypt(pk, sk, C, bound=MESSAGE_BOUND, table_size=None):
+    """ Message m in [0, bound) of a ciphertext in G or G1.
+
+    As q1·h = O (and h1^q1 = 1), q1·C = m·(q1·g) (resp. C^q1 = (e(g, g)^q1)^m), and m is found as a discrete logarithm.
+    Its baby-step table (of table_size elements, default √bound) is kept for later decryptions with the same key.
+    """
+    q1, = sk
+    precomputation = _precomputed(pk)
+    if isinstance(C, WeierstrassCurve.Point):
+        base = precomputation.decryption_base(q1)
+        return precomputation.G.discrete_log(base, q1 * C, bound=bound, table_size=table_size)
+    base = precomputation.decryption_base_G1(q1)
+    return precomputation.G1.discrete_log(base, precomputation.G1.exponentiation(C, q1), bound=bound,
+                                          table_size=table_size)
+
+
+def decrypt_batch(pk, sk, ciphertexts, bound=MESSAGE_BOUND, table_size=None):
+    """ Messages of all ciphertexts (all in G or all in G1).
+
+    The baby-step table is shared: by default it holds √(k·bound) elements for k ciphertexts, balancing its cost with
+    the giant steps of all decryptions.
+    """
+    ciphertexts = list(ciphertexts)
+    if not ciphertexts:
+        return []
+    _, curve, _, _, _, _ = pk
+    q1, = sk
+    table_size = table_size or min(bound, math.isqrt(len(ciphertexts) * bound) + 1)
+    precomputation = _precomputed(pk)
+    if isinstance(ciphertexts[0], WeierstrassCurve.Point):
+        group, base = precomputation.G, precomputation.decryption_base(q1)
+        targets = curve.batch_normalize([q1 * C for C in ciphertexts])
+    else:
+        group, base = precomputation.G1, precomputation.decryption_base_G1(q1)
+        targets = [group.exponentiation(C, q1) for C in ciphertexts]
+    return [group.discrete_log(base, target, bound=bound, table_size=table_size) for target in targets]
+
+
+def encode_ciphertexts(pk, ciphertexts):
+    """ Ciphertexts (all in G or all in G1) in a single bytes object: compressed points, or elements of G1. """
+    _, curve, G1, _, _, _ = pk
+    ciphertexts = list(ciphertexts)
+    if ciphertexts and not isinstance(ciphertexts[0], WeierstrassCurve.Point):
+        return G1.generator.field.encode_elements(ciphertexts)
+    return curve.encode_points(ciphertexts, compressed=True)
+
+
+def decode_ciphertexts(pk, buffer, in_G1=False):
+    """ Ciphertexts encoded by encode_ciphertexts (in G1 iff in_G1), from any bytes-like object. """
+    _, curve, G1, _, _, _ = pk
+    if in_G1:
+        return G1.generator.field.decode_elements(buffer)
+    return curve.decode_points(buffer, compressed=True)
+
+
+class _KeyPrecomputation:
+    """ Values derived from a public key (and secret key), computed once and shared by all operations with it. """
+    def __init__(self, pk):
+        n, curve, G1, e, g, h = pk
+        self.h = h.precompute()    # Fixed-base table for the randomizers r·h
+        self.G = curve.as_group()
+        self.G1 = G1
+        self.h1 = e(g, h)
+        # h1^(2^i), so that h1^r only needs one multiplication per bit set in r
+        self._h1_squares = [self.h1]
+        for _ in range(n.bit_length() - 1):
+            self._h1_squares.append(self._h1_squares[-1] * self._h1_squares[-1])
+        self._e = e
+        self._g = g
+        self._decryption_bases = {}
+
+    def h1_power(self, r):
+        """ h1^r, for 0 <= r < n. """
+        result = self.G1.identity_element
+        for i, square in enumerate(self._h1_squares):
+            if (r >> i) & 1:
+                result = result * square
+        return result
+
+    def decryption_base(self, q1):
+        """ q1·g, base of the discrete logarithms of ciphertexts in G. """
+        if ('G', q1) not in self._decryption_bases:
+            self._decryption_bases[('G', q1)] = (q1 * self._g).normalize()
+        return self._decryption_bases[('G', q1)]
+
+    def decryption_base_G1(self, q1):
+        """ e(g, g)^q1, base of the discrete logarithms of ciphertexts in G1. """
+        if ('G1', q1) not in self._decryption_bases:
+            self._decryption_bases[('G1', q1)] = self.G1.exponentiation(self._e(self._g, self._g), q1)
+        return self._decryption_bases[('G1', q1)]
+
+
+@functools.lru_cache(maxsize=16)
+def _precomputed(pk):
+    return _KeyPrecomputation(pk)
@@ -1,12 +1,25 @@
-from .finitegroup import FiniteGroup
+import math
+import random
+
+import numpy as np
+
+from fields.array import FieldArray
+from fields.primeorder import FiniteFieldPrimeOrder
+from fields.utils import window_size, wnaf
+from .finitegroup import FiniteGroup, factorint
+from .weil import weil_pairing
 
 
 class WeierstrassCurve:
     """ Curve in normal form y^2 = x^3 + ax + b. """
+    PIPPENGER_THRESHOLD = 32    # Minimum number of terms for multi_scalar_mul to use Pippenger's method
+    COUNTING_THRESHOLD = 2 ** 10    # Maximum field size for order() to count the points one x at a time
+
     def __init__(self, a, b, field):
         self.a = field.from_coefficients(a)
         self.b = field.from_coefficients(b)
         self.field = field
+        self._order = None
         assert field.prime > 3, 'Addition operation not implemented for F_2 (specifically slope between points)'
 
     def point(self, x, y, check_belongs=True):
@@ -39,8 +52,18 @@ class WeierstrassCurve:
             return None
         return (point_B.y - point_A.y) / (point_B.x - point_A.x)    # General case for x1 != x2
 
-    def point_generator(self):
+    def point_generator(self, vectorized=False):
         yield WeierstrassCurve.Point(self, None, None)
+        if vectorized:
+            # Evaluate x^3 + ax + b and its square roots on the whole field at once (building the points themselves
+            # remains one Python object at a time, and dominates the running time)
+            xs = self.field.field_elements(as_array=True)
+            ys_squared = xs ** 3 + xs * self.a + self.b
+            has_roots = ys_squared.is_square()
+            for x, root in zip(xs[has_roots], ys_squared[has_roots].square_root()):
+                for y in ([root] if root == 0 else sorted([root, -root], key=lambda r: r.coefficients)):
+                    yield WeierstrassCurve.Point(self, x, y)
+            return
         for x in self.field.field_elements():
             y_squared = x ** 3 + self.a * x + self.b
             for y in self.field.square_root(y_squared):
@@ -49,64 +72,515 @@ class WeierstrassCurve:
     def get_all_points(self):
         return list(self.point_generator())
 
+    def random_point(self):
+        """ Uniformly random point of the curve, other than the point at infinity. """
+        while True:
+            x = self.field.random_element()
+            y = self.field.some_square_root(x ** 3 + self.a * x + self.b)
+            if y is not None:
+                return WeierstrassCurve.Point(self, x, -y if random.getrandbits(1) else y)
+
     def as_group(self):
+        """ Group of points of the curve, whose elements are only enumerated if needed. """
         return FiniteGroup(
-            group_elements=self.get_all_points(),
+            group_elements=self.get_all_points,
             identity_element=WeierstrassCurve.Point(self, None, None),
             operation=lambda P, Q: P + Q,
             inverse=lambda P: -P,
+            order=self.order(),
         )
 
+    def order(self):
+        """ Number of points of the curve (including the point at infinity), computed without enumerating them.
+
+        Uses the closed forms for supersingular curves and for curves over F_p(α) defined over F_p, and otherwise
+        baby-step giant-step on random points of the curve and of its quadratic twist (Mestre's method). Singular curves
+        (4a^3 + 27b^2 = 0), for which the Hasse bound does not hold, have their points counted one x at a time.
+        """
+        if self._order is None:
+            self._order = self._compute_order()
+        return self._order
+
+    def _compute_order(self):
+        field, p = self.field, self.field.prime
+        q = field.order()
+        if 4 * self.a ** 3 + 27 * self.b ** 2 == 0:
+            return self._count_points()
+        if q == p ** 2 and field.frobenius(self.a) == self.a and field.frobenius(self.b) == self.b:
+            # Curve defined over F_p: if #E(F_p) = p + 1 - t, then #E(F_{p^2}) = p^2 + 1 - (t^2 - 2p)
+            base_curve = WeierstrassCurve(self.a.coefficients[0], self.b.coefficients[0], FiniteFieldPrimeOrder(p))
+            t = p + 1 - base_curve.order()
+            return q + 1 - (t * t - 2 * p)
+        if q == p and ((self.a == 0 and p % 3 == 2) or (self.b == 0 and p % 4 == 3)):
+            # Supersingular curves y^2 = x^3 + b and y^2 = x^3 + ax, with trace 0
+            return p + 1
+        if q <= self.COUNTING_THRESHOLD:
+            return self._count_points()
+        try:
+            return self._order_mestre()
+        except ValueError:
+            return self._count_points()
+
+    def _count_points(self):
+        """ Number of points, counting the square roots of x^3 + ax + b for every x. """
+        field = self.field
+        return 1 + sum(len(field.square_root(x ** 3 + self.a * x + self.b)) for x in field.field_elements())
+
+    def _order_mestre(self, max_points=100):
+        """ Order of the curve, from the orders of random points of the curve and of its quadratic twist E', which has
+        #E' = 2q + 2 - #E points. Both lie in the Hasse interval [q + 1 - 2√q, q + 1 + 2√q]. """
+        field = self.field
+        q = field.order()
+        lower, upper = q + 1 - math.isqrt(4 * q), q + 1 + math.isqrt(4 * q)
+        # Twist by a non-square d: y^2 = x^3 + a·d^2·x + b·d^3
+        d = field.random_element()
+        while d == 0 or field.some_square_root(d) is not None:
+            d = field.random_element()
+        twist = WeierstrassCurve(self.a * d * d, self.b * d * d * d, field)
+        exponent, twist_exponent = 1, 1     # Least common multiples of the orders of the points found so far
+        for _ in range(max_points):
+            P, P_twist = self.random_point(), twist.random_point()
+            exponent = math.lcm(exponent, self._point_order_in_interval(P, lower, upper))
+            twist_exponent = math.lcm(twist_exponent, twist._point_order_in_interval(P_twist, lower, upper))
+            # Candidates N for #E, multiples of exponent such that 2q + 2 - N is a multiple of twist_exponent (walking
+            # the multiples of the largest of both)
+            if exponent >= twist_exponent:
+                start = -(-lower // exponent) * exponent
+                candidates = [N for N in range(start, upper + 1, exponent) if (2 * q + 2 - N) % twist_exponent == 0]
+            else:
+                start = -(-lower // twist_exponent) * twist_exponent
+                candidates = [
+                    2 * q + 2 - M for M in range(start, upper + 1, twist_exponent) if (2 * q + 2 - M) % exponent == 0
+                ]
+            if len(candidates) == 1:
+                return candidates[0]
+        raise ValueError(f'Could not determine the order of {self} from {max_points} random points.')
+
+    def _point_order_in_interval(self, P, lower, upper):
+        """ Order of P, given that some multiple of it lies in [lower, upper] (with lower > 0). """
+        # Find m = lower + i·steps + j with m·P = O by baby-step giant-step, i.e. j·P = -(lower + i·steps)·P
+        steps = math.isqrt(upper - lower) + 1
+        baby_steps = [self.neutral_element()]
+        for _ in range(steps - 1):
+            baby_steps.append(baby_steps[-1] + P)
+        table = {}
+        for j, R in enumerate(self.batch_normalize(baby_steps)):
+            table.setdefault(R, j)
+        giant_step = -(steps * P)
+        Q = -(lower * P)
+        for i in range(steps + 1):
+            if Q in table:
+                m = lower + i * steps + table[Q]
+                break
+            Q = Q + giant_step
+        else:
+            raise ValueError(f'No multiple of the order of {P} lies in [{lower}, {upper}].')
+        # The order of P divides m: remove all prime factors which are not needed
+        for prime, exp in factorint(m):
+            for _ in range(exp):
+                if (m // prime) * P != self.neutral_element():
+                    break
+                m //= prime
+        return m
+
+    def group_structure(self, max_points=100):
+        """ Returns (n1, n2) such that the group of points is isomorphic to Z_n1 x Z_n2, with n2 dividing n1.
+
+        For each prime l, with l^e the largest power of l dividing the order, the l-part is Z_{l^a} x Z_{l^b}: a is the
+        largest exponent of the orders of (random) points of the l-part, and b = e - a is certified by the Weil pairing
+        e_{l^a} of two of them (as the l-part lies in E[l^a]) being a primitive l^b-th root of unity.
+        """
+        N = self.order()
+        n1, n2 = 1, 1
+        for prime, exp in factorint(N):
+            cofactor = N // prime ** exp
+            a, points = 0, []
+            for _ in range(max_points):
+                T = cofactor * self.random_point()    # Random point of the l-part
+                a = max(a, self._prime_power_order_exponent(T, prime))
+                points.append(T)
+                if a == exp:
+                    break
+                if len(points) >= 2 and self._pairing_exponent(points[-2], points[-1], prime, a) == exp - a:
+                    break
+            else:
+                raise ValueError(f'Could not determine the {prime}-part of {self} from {max_points} random points.')
+            n1, n2 = n1 * prime ** a, n2 * prime ** (exp - a)
+        return n1, n2
+
+    def _prime_power_order_exponent(self, T, prime):
+        """ k such that T has order prime^k (which must be the case). """
+        k = 0
+        while not T.is_infinity():
+            T, k = prime * T, k + 1
+        return k
+
+    def _pairing_exponent(self, T1, T2, prime, a, attempts=8):
+        """ k such that e_{l^a}(T1, T2) has order l^k, for T1, T2 in E[l^a], with l = prime. """
+        if T1.is_infinity() or T2.is_infinity():
+            return 0
+        for _ in range(attempts):
+            try:
+                value = weil_pairing(T1, T2, prime ** a, S=self.random_point())
+                break
+            except ValueError:  # Unsuitable auxiliary point S
+                continue
+        else:
+            return 0
+        k = 0
+        while value != 1:
+            value, k = value ** prime, k + 1
+        return k
+
+    def batch_normalize(self, points):
+        """ Convert (in place) all points to affine coordinates, with a single field inversion. """
+        points = list(points)
+        pending = [P for P in points if not P._is_normalized]
+        for P, z_inv in zip(pending, self.field.batch_inverse([P._Z for P in pending])):
+            P.normalize(z_inv=z_inv)
+        return points
+
+    def multi_scalar_mul(self, points, scalars):
+        """ Compute sum(k_i · P_i) sharing one doubling chain among all terms.
+
+        Uses Straus' interleaved wNAF method for small batches, and Pippenger's bucket method for large ones.
+        """
+        points, scalars = list(points), list(scalars)
+        if len(points) != len(scalars):
+            raise ValueError(f'Got {len(points)} points but {len(scalars)} scalars.')
+        assert all(isinstance(k, int) for k in scalars)
+        # Make all scalars non-negative, and drop terms that contribute nothing
+        terms = [(P if k >= 0 else -P, abs(k)) for P, k in zip(points, scalars) if k != 0 and not P.is_infinity()]
+        if not terms:
+            return self.neutral_element()
+        if len(terms) < self.PIPPENGER_THRESHOLD:
+            return self._straus(terms)
+        return self._pippenger(terms)
+
+    def _straus(self, terms):
+        window = window_size(max(k for _, k in terms).bit_length())
+        tables, digits = [], []
+        for P, k in terms:
+            odd_multiples = [P]     # P, 3P, ..., (2^(w-1)-1)P
+            if window > 2:
+                twice = P.double()
+                for _ in range(2 ** (window - 2) - 1):
+                    odd_multiples.append(odd_multiples[-1] + twice)
+            tables.append(odd_multiples)
+            digits.append(wnaf(k, window))
+        value = self.neutral_element()
+        for i in reversed(range(max(len(d) for d in digits))):
+            value = value.double()
+            for odd_multiples, d in zip(tables, digits):
+                digit = d[i] if i < len(d) else 0
+                if digit > 0:
+                    value = value + odd_multiples[digit // 2]
+                elif digit < 0:
+                    value = value - odd_multiples[-digit // 2]
+        return value
+
+    def _pippenger(self, terms):
+        window = max(2, len(terms).bit_length() - 2)
+        mask = (1 << window) - 1
+        n_windows = -(-max(k for _, k in terms).bit_length() // window)
+        value = self.neutral_element()
+        for i in reversed(range(n_windows)):
+            for _ in range(window):
+                value = value.double()
+            # Bucket j accumulates the points whose i-th digit is j + 1
+            buckets = [self.neutral_element() for _ in range(mask)]
+            for P, k in terms:
+                digit = (k >> (window * i)) & mask
+                if digit:
+                    buckets[digit - 1] = buckets[digit - 1] + P
+            # sum_j (j+1) · bucket_j, computed with running sums
+            running_sum = self.neutral_element()
+            window_sum = self.neutral_element()
+            for bucket in reversed(buckets):
+                running_sum = running_sum + bucket
+                window_sum = window_sum + running_sum
+            value = value + window_sum
+        return value
+
+    # Byte encoding of points: a prefix byte, POINT_INFINITY (followed by zeros), POINT_UNCOMPRESSED (followed by x and
+    # y) or POINT_COMPRESSED + sign of y (followed by x), where the sign is the parity of the first non-zero coefficient.
+    POINT_INFINITY = 0
+    POINT_COMPRESSED = 2
+    POINT_UNCOMPRESSED = 4
+
+    def point_size(self, compressed=False):
+        """ Number of bytes of the encoding of each point. """
+        return 1 + (1 if compressed else 2) * self.field.element_size()
+
+    def point_from_bytes(self, data, compressed=None):
+        """ Point encoded by point.to_bytes() (compressed or not, as told by its length unless given). """
+        if compressed is None:
+            compressed = len(data) == self.point_size(compressed=True)
+        if len(data) != self.point_size(compressed):
+            raise ValueError(f'Expected {self.point_size(compressed)} bytes for a point of {self}, but got {len(data)}.')
+        prefix, size = data[0], self.field.element_size()
+        if prefix == self.POINT_INFINITY:
+            return self.neutral_element()
+        x = self.field.from_bytes(data[1:1 + size])
+        if prefix == self.POINT_UNCOMPRESSED and not compressed:
+            return self.point(x, self.field.from_bytes(data[1 + size:]))
+        elif prefix in (self.POINT_COMPRESSED, self.POINT_COMPRESSED + 1) and compressed:
+            y = self.field.some_square_root(x ** 3 + self.a * x + self.b)
+            if y is None:
+                raise ValueError(f'No point of {self} has x = {x}.')
+            return WeierstrassCurve.Point(self, x, self._with_sign(y, prefix - self.POINT_COMPRESSED))
+        raise ValueError(f'Unknown point encoding prefix {prefix} (for {compressed=}).')
+
+    def encode_points(self, points, compressed=False):
+        """ Concatenated fixed-width encodings of all points, as a single bytes object (computing their affine
+        coordinates with a single field inversion). """
+        return b''.join(P.to_bytes(compressed) for P in self.batch_normalize(points))
+
+    def decode_points(self, buffer, compressed=False):
+        """ Points encoded by encode_points in a bytes-like object, read through a memoryview without copies.
+
+        For compressed points, the y coordinates are recovered with vectorized square roots (see FieldArray).
+        """
+        buffer, size = memoryview(buffer), self.point_size(compressed)
+        if len(buffer) % size != 0:
+            raise ValueError(f'Buffer length {len(buffer)} is not a multiple of the point size ({size} bytes).')
+        encodings = [buffer[i:i + size] for i in range(0, len(buffer), size)]
+        if not compressed:
+            return [self.point_from_bytes(data, compressed=False) for data in encodings]
+        points = [None] * len(encodings)
+        finite = []     # Indices of the points other than O
+        for i, data in enumerate(encodings):
+            if data[0] == self.POINT_INFINITY:
+                points[i] = self.neutral_element()
+            elif data[0] in (self.POINT_COMPRESSED, self.POINT_COMPRESSED + 1):
+                finite.append(i)
+            else:
+                raise ValueError(f'Unknown point encoding prefix {data[0]} (for compressed=True).')
+        if finite:
+            xs = FieldArray.from_elements(self.field, [self.field.from_bytes(encodings[i][1:]) for i in finite])
+            ys_squared = xs ** 3 + xs * self.a + self.b
+            if not np.all(ys_squared.is_square()):
+                raise ValueError(f'Some encoded x coordinates are not the ones of points of {self}.')
+            ys = ys_squared.square_root()
+            for i, x, y in zip(finite, xs, ys):
+                points[i] = WeierstrassCurve.Point(self, x, self._with_sign(y, encodings[i][0] - self.POINT_COMPRESSED))
+        return points
+
+    @staticmethod
+    def _sign(y):
+        """ Parity of the first non-zero coefficient of y (0 for y = 0), which differs for y and -y != y. """
+        return next((c & 1 for c in y.coefficients if c != 0), 0)
+
+    def _with_sign(self, y, sign):
+        """ y or -y, whichever has the given sign. """
+        if y == 0 and sign:
+            raise ValueError('The point with y = 0 can only be encoded with sign 0.')
+        return y if self._sign(y) == sign else -y
+
     def __repr__(self):
         return f'y^2 = x^3 + ({self.a})·x + ({self.b}) (for x, y in {self.field})'
 
     class Point:
+        """ Point stored in Jacobian coordinates (X : Y : Z), i.e. the affine point (X/Z^2, Y/Z^3).
+
+        Addition and doubling are inversion-free; affine coordinates are only computed (with one inversion) when x or y
+        are read, or when points are compared or hashed. The point at infinity is stored as X = Y = Z = None.
+        """
+        _fixed_base_table = None    # Set by precompute()
+
         def __init__(self, curve, x, y):
             if x is None and y is None:
                 # Point at infinity
-                self.x = None
-                self.y = None
+                self._X, self._Y, self._Z = None, None, None
             elif x is None or y is None:
                 raise ValueError('Both x and y must be None or not None')
             else:
-                self.x = curve.field.from_coefficients(x)
-                self.y = curve.field.from_coefficients(y)
+                self._X = curve.field.from_coefficients(x)
+                self._Y = curve.field.from_coefficients(y)
+                self._Z = curve.field.one
+            self._is_normalized = True     # Whether Z = 1 (or point at infinity)
             self.curve = curve
 
+        @classmethod
+        def from_jacobian(cls, curve, X, Y, Z):
+            """ Point with Jacobian coordinates (X : Y : Z), which must be on the curve and have Z != 0. """
+            point = cls.__new__(cls)
+            point._X, point._Y, point._Z = X, Y, Z
+            point._is_normalized = False
+            point.curve = curve
+            return point
+
+        def is_infinity(self):
+            return self._Z is None
+
+        def to_bytes(self, compressed=False):
+            """ Fixed-width encoding (see WeierstrassCurve.POINT_* and point_from_bytes). """
+            curve = self.curve
+            if self.is_infinity():
+                return bytes(curve.point_size(compressed))
+            if compressed:
+                return bytes([curve.POINT_COMPRESSED + curve._sign(self.y)]) + self.x.to_bytes()
+            return bytes([curve.POINT_UNCOMPRESSED]) + self.x.to_bytes() + self.y.to_bytes()
+
+        def normalize(self, z_inv=None):
+            """ Convert (in place) to Z = 1, so that X and Y are the affine coordinates (z_inv = 1/Z, if known). """
+            if not self._is_normalized:
+                z_inv = 1 / self._Z if z_inv is None else z_inv
+                z_inv_squared = z_inv * z_inv
+                self._X = self._X * z_inv_squared
+                self._Y = self._Y * z_inv_squared * z_inv
+                self._Z = self.curve.field.one
+                self._is_normalized = True
+            return self
+
+        @property
+        def x(self):
+            return self.normalize()._X
+
+        @property
+        def y(self):
+            return self.normalize()._Y
+
+        def double(self):
+            if self._Z is None or self._Y == 0:     # Doubling O, or point with y = 0 -> infty
+                return self.curve.neutral_element()
+            X, Y, Z = self._X, self._Y, self._Z
+            # Formulas dbl-2007-bl (general a), with S = 4·X·Y^2 and M = 3·X^2 + a·Z^4
+            XX = X * X
+            YY = Y * Y
+            YYYY = YY * YY
+            S = 4 * X * YY
+            M = 3 * XX + (self.curve.a if self._is_normalized else self.curve.a * (Z * Z) ** 2)
+            X3 = M * M - 2 * S
+            Y3 = M * (S - X3) - 8 * YYYY
+            Z3 = 2 * Y if self._is_normalized else 2 * Y * Z
+            return self.from_jacobian(self.curve, X3, Y3, Z3)
+
         def __add__(self, other):
             assert isinstance(other, self.__class__)
-            if self.x is None:
+            if self._Z is None:
                 return other
-            if other.x is None:
+            if other._Z is None:
                 return self
-            if self.x == other.x and self.y != other.y:
-                return self.__class__(self.curve, None, None)
-            lmbda = self.curve.slope(self, other)
-            if lmbda is None:   # Doubling a point with lmbd = infty
-                return self.__class__(self.curve, None, None)
-            x = lmbda ** 2 - self.x - other.x
-            y = lmbda * (self.x - x) - self.y
-            return self.__class__(self.curve, x, y)
+            # Formulas add-2007-bl, skipping multiplications by Z1 = 1 or Z2 = 1 (mixed addition)
+            X1, Y1, Z1 = self._X, self._Y, self._Z
+            X2, Y2, Z2 = other._X, other._Y, other._Z
+            if other._is_normalized:
+                U1, S1 = X1, Y1
+            else:
+                Z2Z2 = Z2 * Z2
+                U1, S1 = X1 * Z2Z2, Y1 * Z2 * Z2Z2
+            if self._is_normalized:
+                U2, S2 = X2, Y2
+            else:
+                Z1Z1 = Z1 * Z1
+                U2, S2 = X2 * Z1Z1, Y2 * Z1 * Z1Z1
+            H = U2 - U1
+            R = S2 - S1
+            if H == 0:
+                if R == 0:      # Same point
+                    return self.double()
+                return self.curve.neutral_element()     # Pair of points (x, y) and (x, -y)
+            HH = H * H
+            HHH = H * HH
+            V = U1 * HH
+            X3 = R * R - HHH - 2 * V
+            Y3 = R * (V - X3) - S1 * HHH
+            Z3 = H
+            if not self._is_normalized:
+                Z3 = Z3 * Z1
+            if not other._is_normalized:
+                Z3 = Z3 * Z2
+            return self.from_jacobian(self.curve, X3, Y3, Z3)
 
         def __neg__(self):
-            return self.__class__(self.curve, self.x, -self.y)
+            if self._Z is None:
+                return self
+            negated = self.from_jacobian(self.curve, self._X, -self._Y, self._Z)
+            negated._is_normalized = self._is_normalized
+            return negated
 
         def __sub__(self, other):
             assert isinstance(other, self.__class__)
             return self + (-other)
 
         def __mul__(self, other):
+            assert isinstance(other, int)
+            if self._fixed_base_table is not None:
+                return self._fixed_base_multiply(other)
+            return self.wnaf_multiply(other)
+
+        def double_and_add_multiply(self, other):
             assert isinstance(other, int)
             base = self if other >= 0 else -self
             times = abs(other)
             # Double-and-add algorithm
             value = self.curve.neutral_element()
             for bit in bin(times)[2:]:    # Skip '0b' prefix
-                value = value + value
+                value = value.double()
                 if bit == '1':
                     value = value + base
             return value
 
+        def wnaf_multiply(self, other, window=None):
+            """ Scalar multiplication using the width-w NAF of the scalar and the odd multiples P, 3P, ..., (2^(w-1)-1)P. """
+            assert isinstance(other, int)
+            base = self if other >= 0 else -self
+            times = abs(other)
+            window = window or window_size(times.bit_length())
+            odd_multiples = [base]
+            if window > 2:
+                twice = base.double()
+                for _ in range(2 ** (window - 2) - 1):
+                    odd_multiples.append(odd_multiples[-1] + twice)
+            value = self.curve.neutral_element()
+            for digit in reversed(wnaf(times, window)):
+                value = value.double()
+                if digit > 0:
+                    value = value + odd_multiples[digit // 2]
+                elif digit < 0:
+                    value = value - odd_multiples[-digit // 2]
+            return value
+
+        def precompute(self, window=4):
+            """ Build a fixed-base table for this point, so later multiplications by any scalar only need additions.
+
+            The table stores j · 2^(window·i) · P for 1 <= j < 2^window, and grows with the largest scalar used.
+            """
+            self._fixed_base_window = window
+            self._fixed_base_table = []
+            return self
+
+        def _extend_fixed_base_table(self, n_windows):
+            table = self._fixed_base_table
+            while len(table) < n_windows:
+                if table:
+                    row_base = table[-1][0]
+                    for _ in range(self._fixed_base_window):
+                        row_base = row_base.double()
+                else:
+                    row_base = self
+                row = [row_base]
+                for _ in range(2 ** self._fixed_base_window - 2):
+                    row.append(row[-1] + row_base)
+                self.curve.batch_normalize(row)   # Affine table entries allow mixed (cheaper) additions
+                table.append(row)
+
+        def _fixed_base_multiply(self, other):
+            times = abs(other)
+            window = self._fixed_base_window
+            self._extend_fixed_base_table(-(-times.bit_length() // window))
+            mask = (1 << window) - 1
+            value = self.curve.neutral_element()
+            for row in self._fixed_base_table:
+                if times == 0:
+                    break
+                digit = times & mask
+                if digit:
+                    value = value + row[digit - 1]
+                times >>= window
+            return value if other >= 0 else -value
+
         def __rmul__(self, other):
             return self.__mul__(other)
 
@@ -117,8 +591,8 @@ class WeierstrassCurve:
             assert isinstance(other, self.__class__)
             if self.curve != other.curve:
                 return False
-            if self.x is None and other.x is None and self.y is None and other.y is None:
-                return True
+            if self._Z is None or other._Z is None:
+                return self._Z is None and other._Z is None
             return self.x == other.x and self.y == other.y
 
         def __hash__(self):
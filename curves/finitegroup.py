@@ -1,52 +1,277 @@
+import functools
+import math
+import random
+from collections import OrderedDict
+
 import sympy
-from sympy import divisors
+from sympy.ntheory.modular import crt
+
+from fields.utils import window_size
+
+
+@functools.lru_cache(maxsize=128)
+def factorint(n):
+    """ Prime factorization of n, as a tuple of pairs (prime, exponent) (cached, since group orders are reused). """
+    return tuple(sorted(sympy.factorint(n).items()))
 
 
 class FiniteGroup:
-    def __init__(self, group_elements, identity_element, operation, inverse, order_by_element=None):
-        self.group_elements = group_elements
+    """ Finite group given by its elements, identity, operation and inverse.
+
+    The elements may be given lazily, as a callable returning them, in which case they are only materialized when
+    needed; the order of the group should then be given too, as computing it requires all elements. Cyclic groups of
+    known order may also be given by a generator alone (see FiniteGroup.cyclic), never storing their elements.
+    """
+    ORDER_CACHE_SIZE = 2 ** 16  # Maximum number of element orders kept (least recently used ones are dropped)
+    RHO_THRESHOLD = 2 ** 20     # Prime orders from which discrete_log uses Pollard's rho instead of baby-step giant-step
+
+    def __init__(self, group_elements, identity_element, operation, inverse, order_by_element=None, order=None):
+        self._group_elements = group_elements
         self.identity_element = identity_element
         self.operation = operation
         self.inverse = inverse
-        self._order_of_group = len(group_elements)
-        self._order_of_group_divisors = divisors(self._order_of_group)  # [d1, d2, ...]
-        self._order_of_group_divisors.sort()
-        self._order_by_element = {} if order_by_element is None else order_by_element
+        self._order_of_group = order
+        # Shared with the groups passing it along, if already an OrderedDict
+        if not isinstance(order_by_element, OrderedDict):
+            order_by_element = OrderedDict(order_by_element or {})
+        self._order_by_element = order_by_element
+        self._baby_step_tables = {}     # {base: (table {base^j: j}, steps, whether complete)}, reused by discrete_log
+        self.generator = None           # Set for groups built by FiniteGroup.cyclic
+
+    @classmethod
+    def cyclic(cls, generator, order, identity_element, operation, inverse):
+        """ Cyclic group generated by an element of the given order, using O(1) memory.
+
+        Its elements are produced one at a time when iterating over the group, and x belongs to it iff x^order is the
+        identity (which assumes, as for the n-th roots of unity of a field, that no other element of the ambient group
+        satisfies it).
+        """
+        def powers():
+            element = identity_element
+            for _ in range(order):
+                yield element
+                element = operation(element, generator)
+
+        group = cls(group_elements=powers, identity_element=identity_element, operation=operation, inverse=inverse,
+                    order=order)
+        group.generator = generator
+        return group
+
+    def __iter__(self):
+        if callable(self._group_elements):
+            return iter(self._group_elements())     # Do not materialize them
+        return iter(self._group_elements)
+
+    def __contains__(self, element):
+        if self.generator is not None:
+            return self.exponentiation(element, self.order_of_group()) == self.identity_element
+        return element in self.group_elements
+
+    @property
+    def group_elements(self):
+        if callable(self._group_elements):
+            self._group_elements = list(self._group_elements())
+        return self._group_elements
 
     def order_of_group(self):
         if self._order_of_group is None:
-            self._order_of_group = len(self.group_elements())
+            self._order_of_group = len(self.group_elements)
         return self._order_of_group
 
     def get_nontrivial_element(self):
         if self.order_of_group() == 1:
             raise ValueError('Group has only one element')
-        elements = self.group_elements()
-        elements.sort(key=lambda x: self.order(x))
+        if self.generator is not None:
+            # Element of the smallest order, i.e. the smallest prime dividing |G|
+            prime, _ = factorint(self.order_of_group())[0]
+            return self.exponentiation(self.generator, self.order_of_group() // prime)
+        elements = sorted(self.group_elements, key=lambda x: self.order(x))
         return elements[1]
 
     def order(self, element):
-        if element not in self._order_by_element:
-            for d in self._order_of_group_divisors:
-                if self.exponentiation(element, d) == self.identity_element:
-                    self._order_by_element[element] = d
-                    return d
-            raise ValueError(f'Element {element} has order not divided by |G| = {self.order_of_group()}.')
-        return self._order_by_element[element]
-
-    def exponentiation(self, element, exp):
+        cache = self._order_by_element
+        if element in cache:
+            cache.move_to_end(element)
+            return cache[element]
+        order = self.order_of_group()
+        if self.exponentiation(element, order) != self.identity_element:
+            raise ValueError(f'Element {element} has order not divided by |G| = {order}.')
+        # Divide out each prime r while element^(order / r) is still the identity
+        for prime, exp in factorint(order):
+            for _ in range(exp):
+                if self.exponentiation(element, order // prime) != self.identity_element:
+                    break
+                order //= prime
+        cache[element] = order
+        while len(cache) > self.ORDER_CACHE_SIZE:
+            cache.popitem(last=False)
+        return order
+
+    def exponentiation(self, element, exp, window=None):
         """ Repeatedly apply the group operation of one element with itself. """
         assert isinstance(exp, int)
         base = element if exp >= 0 else self.inverse(element)
         exp = abs(exp)
-        # Double-and-add algorithm
+        # Sliding-window algorithm, with precomputed odd powers base^1, base^3, ..., base^(2^w - 1)
+        window = window or window_size(exp.bit_length())
+        odd_powers = [base]
+        if window > 1 and exp > 1:
+            square = self.operation(base, base)
+            for _ in range(2 ** (window - 1) - 1):
+                odd_powers.append(self.operation(odd_powers[-1], square))
+        bits = bin(exp)[2:]     # Avoid '0b' prefix
         result = self.identity_element
-        for bit in bin(exp)[2:]:    # Avoid '0b' prefix and left-most bit (always set to 1).
-            result = self.operation(result, result)
-            if bit == '1':
-                result = self.operation(result, base)
+        i = 0
+        while i < len(bits):
+            if bits[i] == '0':
+                result = self.operation(result, result)
+                i += 1
+                continue
+            # Longest window bits[i:j] of length <= w ending in a '1'
+            j = min(i + window, len(bits))
+            while bits[j - 1] == '0':
+                j -= 1
+            for _ in range(j - i):
+                result = self.operation(result, result)
+            result = self.operation(result, odd_powers[int(bits[i:j], 2) // 2])
+            i = j
         return result
 
+    def discrete_log(self, base, target, bound=None, method='bsgs', table_size=None):
+        """ Returns some k such that base^k = target, raising ValueError if there is none.
+
+        If bound is given, k is searched in [0, bound), either by baby-step giant-step (method='bsgs', using baby-step
+        tables of table_size elements, default √bound, which are kept for later calls with the same base) or by Pollard's
+        kangaroo method (method='kangaroo', with O(1) memory). Otherwise, k is found modulo the order of base by
+        Pohlig-Hellman, with baby-step giant-step or Pollard's rho for each prime factor.
+        """
+        if method not in ('bsgs', 'kangaroo'):
+            raise ValueError(f'Unknown {method=} (expected "bsgs" or "kangaroo").')
+        if bound is not None and bound < 1:
+            raise ValueError(f'Exponents are searched in [0, bound), which requires bound >= 1 (got {bound=}).')
+        if bound is not None:
+            if method == 'kangaroo':
+                k = self._kangaroo(base, target, bound)
+            else:
+                k = self._baby_step_giant_step(base, target, bound, table_size or math.isqrt(bound - 1) + 1)
+        else:
+            k = self._pohlig_hellman(base, target)
+        if k is None:
+            raise ValueError(f'{target} is not a power of {base}' + (f' with exponent in [0, {bound}).' if bound else '.'))
+        return k
+
+    def baby_step_table(self, base, size):
+        """ Returns ({base^j: j for j < m}, m), for some m >= size (or m = order(base), if smaller). """
+        table, steps, complete = self._baby_step_tables.get(base, (None, 0, False))
+        if table is None or (steps < size and not complete):
+            table, element, complete = {}, self.identity_element, False
+            for j in range(size):
+                if element in table:    # base has order j: the table holds the whole subgroup it generates
+                    complete = True
+                    break
+                table[element] = j
+                element = self.operation(element, base)
+            steps = len(table)
+            self._baby_step_tables[base] = (table, steps, complete)
+        return table, steps
+
+    def _baby_step_giant_step(self, base, target, bound, table_size):
+        """ k in [0, bound) with base^k = target, written as k = i·m + j for base^j = target · base^(-i·m). """
+        table, steps = self.baby_step_table(base, table_size)
+        giant_step = self.exponentiation(base, -steps)
+        element = target
+        for i in range(-(-bound // steps)):
+            if element in table:
+                k = i * steps + table[element]
+                return k if k < bound else None
+            element = self.operation(element, giant_step)
+        return None
+
+    def _kangaroo(self, base, target, bound, attempts=8):
+        """ k in [0, bound) with base^k = target, by Pollard's kangaroo (lambda) method. """
+        # Jumps base^(2^i) for i < n_jumps, chosen from a hash of the current element: n_jumps is the smallest making
+        # their mean (2^n_jumps - 1) / n_jumps at least √bound / 2, which minimizes the expected number of jumps
+        n_jumps = 1
+        while (2 ** n_jumps - 1) // n_jumps < math.isqrt(bound) // 2:
+            n_jumps += 1
+        jumps = [(2 ** i, self.exponentiation(base, 2 ** i)) for i in range(n_jumps)]
+        n_tame_jumps = 4 * math.isqrt(bound) + 4
+        for attempt in range(attempts):
+            def jump(element):
+                return jumps[hash((element, attempt)) % n_jumps]
+            # The tame kangaroo starts at base^bound and sets a trap where it stops
+            tame, tame_distance = self.exponentiation(base, bound), 0
+            for _ in range(n_tame_jumps):
+                distance, step = jump(tame)
+                tame, tame_distance = self.operation(tame, step), tame_distance + distance
+            # The wild kangaroo starts at target = base^k, and falls in the trap if its path meets the tame one
+            wild, wild_distance = target, 0
+            while wild_distance <= bound + tame_distance:
+                if wild == tame:
+                    k = bound + tame_distance - wild_distance
+                    if 0 <= k < bound:
+                        return k
+                    break
+                distance, step = jump(wild)
+                wild, wild_distance = self.operation(wild, step), wild_distance + distance
+        # Fall back to an exhaustive search (the kangaroo method is probabilistic)
+        return self._baby_step_giant_step(base, target, bound, math.isqrt(bound - 1) + 1)
+
+    def _pohlig_hellman(self, base, target):
+        """ k modulo order(base) with base^k = target, from its values modulo each prime power dividing order(base). """
+        order = self.order(base)
+        residues, moduli = [], []
+        for prime, exp in factorint(order):
+            # Work in the subgroup of order prime^exp, and find the base-prime digits of k one at a time
+            cofactor = order // prime ** exp
+            base_i, target_i = self.exponentiation(base, cofactor), self.exponentiation(target, cofactor)
+            generator = self.exponentiation(base_i, prime ** (exp - 1))     # Element of order prime
+            k = 0
+            for digit in range(exp):
+                # (target_i · base_i^(-k))^(prime^(exp-1-digit)) = generator^(digit-th base-prime digit of k)
+                element = self.operation(target_i, self.exponentiation(base_i, -k))
+                element = self.exponentiation(element, prime ** (exp - 1 - digit))
+                if prime < self.RHO_THRESHOLD:
+                    d = self._baby_step_giant_step(generator, element, prime, math.isqrt(prime - 1) + 1)
+                else:
+                    d = self._pollard_rho(generator, element, prime)
+                if d is None:
+                    return None
+                k += d * prime ** digit
+            residues.append(k)
+            moduli.append(prime ** exp)
+        k = int(crt(moduli, residues)[0]) if moduli else 0
+        return k if self.exponentiation(base, k) == target else None
+
+    def _pollard_rho(self, base, target, order, attempts=8):
+        """ k modulo order (a prime) with base^k = target, by Pollard's rho method with Floyd cycle detection. """
+        def step(element, a, b):
+            # Walk element = base^a · target^b, partitioned in three classes by its hash
+            partition = hash(element) % 3
+            if partition == 0:
+                return self.operation(element, base), (a + 1) % order, b
+            elif partition == 1:
+                return self.operation(element, element), 2 * a % order, 2 * b % order
+            return self.operation(element, target), a, (b + 1) % order
+
+        for _ in range(attempts):
+            a, b = random.randrange(order), random.randrange(order)
+            start = self.operation(self.exponentiation(base, a), self.exponentiation(target, b))
+            slow, fast = (start, a, b), (start, a, b)
+            while True:
+                slow = step(*slow)
+                fast = step(*step(*fast))
+                if slow[0] == fast[0]:
+                    break
+            # base^(a1) · target^(b1) = base^(a2) · target^(b2), so k · (b1 - b2) = a2 - a1 (mod order)
+            (_, a1, b1), (_, a2, b2) = slow, fast
+            if (b1 - b2) % order != 0:
+                k = (a2 - a1) * pow(b1 - b2, -1, order) % order
+                if self.exponentiation(base, k) == target:
+                    return k
+        # Fall back to an exhaustive search (only likely to be needed for tiny orders)
+        return self._baby_step_giant_step(base, target, order, math.isqrt(order - 1) + 1)
+
     def cyclic_subgroup(self, generator):
         elements = [generator]
         while elements[-1] != self.identity_element:
@@ -54,16 +279,17 @@ class FiniteGroup:
         return FiniteGroup([elements[-1]] + elements[:-1], self.identity_element, self.operation, self.inverse)
 
     def subgroup_generated_by(self, elements):
-        subgroup_elements = {self.identity_element}
-
-        for e in elements:
-            factor = self.identity_element
-            cosets = []
-            for _ in range(self.order(e)):
-                factor = self.operation(factor, e)
-                cosets.append(set(self.operation(factor, element) for element in subgroup_elements))
-            for _ in range(self.order(e)):
-                subgroup_elements = subgroup_elements | cosets.pop(0)
+        """ Subgroup generated by the given elements, enumerated once each by closing {identity} under multiplication
+        by the generators (in a finite group, this also yields the inverses). """
+        generators = list(elements)
+        subgroup_elements = [self.identity_element]
+        visited = {self.identity_element}
+        for element in subgroup_elements:   # Grows while being walked, until no new elements are found
+            for generator in generators:
+                product = self.operation(element, generator)
+                if product not in visited:
+                    visited.add(product)
+                    subgroup_elements.append(product)
 
         return FiniteGroup(
             group_elements=subgroup_elements,
@@ -74,47 +300,42 @@ class FiniteGroup:
 
     def n_torsion_subgroup(self, n):
         """ Returns the elements of order n. """
-        ntorsion_elements = [element for element in self.group_elements if n % self.order(element) == 0]
+        order_by_element = {}
+        for element in self.group_elements:
+            order = self.order(element)
+            if n % order == 0:
+                order_by_element[element] = order
         return FiniteGroup(
-            group_elements=ntorsion_elements,
+            group_elements=list(order_by_element),
             identity_element=self.identity_element,
             operation=self.operation,
             inverse=self.inverse,
-            order_by_element={element: self._order_by_element[element] for element in ntorsion_elements}
+            order_by_element=order_by_element
         )
 
     def quotient_group(self, subgroup):
-        remaining_elements = self.group_elements
-        cosets = {}     # Dictionary {representative: coset}
-        element_to_representative = {}
-        while len(remaining_elements) > 0:
-            coset_representative = remaining_elements.pop(0)
-            coset = tuple(
-                self.operation(coset_representative, element)
-                for element in subgroup.group_elements
-            )
-            element_to_representative = element_to_representative | {   # Add to the dictionary
-                element: coset_representative
-                for element in coset
-            }
-            cosets[coset_representative] = coset
-
-            remaining_elements = [
-                element
-                for element in remaining_elements
-                if element not in coset
-            ]
+        """ Group of cosets g·H (as tuples), built with |G| operations and without modifying this group. """
+        subgroup_elements = list(subgroup.group_elements)
+        cosets = []         # Cosets, in order of their first element in group_elements
+        coset_index = {}    # Dictionary {element: index of its coset}
+        for element in self.group_elements:
+            if element in coset_index:
+                continue
+            coset = tuple(self.operation(element, h) for h in subgroup_elements)
+            for g in coset:
+                coset_index[g] = len(cosets)
+            cosets.append(coset)
 
         return FiniteGroup(
-            group_elements=list(cosets.values()),
-            identity_element=cosets[element_to_representative[self.identity_element]],
-            operation=lambda c1, c2: cosets[element_to_representative[self.operation(c1[0], c2[0])]],
-            inverse=lambda c1: cosets[element_to_representative[self.inverse(c1[0])]]
+            group_elements=cosets,
+            identity_element=cosets[coset_index[self.identity_element]],
+            operation=lambda c1, c2: cosets[coset_index[self.operation(c1[0], c2[0])]],
+            inverse=lambda c1: cosets[coset_index[self.inverse(c1[0])]]
         )
 
     def classify_finite_abelian_group(self):
         subgroups = []
-        for prime, exp in sympy.factorint(self.order_of_group()).items():
+        for prime, exp in factorint(self.order_of_group()):
             orders = set(prime ** i for i in range(exp + 1))
             subgroups += [
                 FiniteGroup(
@@ -0,0 +1,102 @@
+""" Opt-in parallel versions of batch operations, distributing chunks of work over a process pool.
+
+Arguments are pickled to the worker processes; results come back as integer coefficients and are rebuilt on the
+caller's curve and field objects, so that they compare equal to (and combine with) the caller's points and elements.
+"""
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from curves.weil import tate_pairing, weil_pairing
+
+
+def batch_pairings(pairs, n, pairing='weil', max_workers=None):
+    """ [e_n(P, Q) for (P, Q) in pairs], for pairing='weil' or 'tate'. """
+    if pairing not in ('weil', 'tate'):
+        raise ValueError(f'Unknown {pairing=} (expected "weil" or "tate").')
+    pairs = list(pairs)
+    if not pairs:
+        return []
+    field = pairs[0][0].curve.field
+    results = _map_chunks(functools.partial(_pairings, n=n, pairing=pairing), pairs, max_workers)
+    return [field.element_class._trusted(field, *coefficients) for coefficients in results]
+
+
+def batch_scalar_mul(points, scalars, max_workers=None):
+    """ [k · P for P, k in zip(points, scalars)]. """
+    points, scalars = list(points), list(scalars)
+    if len(points) != len(scalars):
+        raise ValueError(f'Got {len(points)} points but {len(scalars)} scalars.')
+    if not points:
+        return []
+    curve = points[0].curve
+    return [_decode_point(curve, P) for P in _map_chunks(_scalar_muls, list(zip(points, scalars)), max_workers)]
+
+
+def get_all_points(curve, max_workers=None):
+    """ Same as curve.get_all_points(), partitioning the x coordinates (in the order of field_elements) in ranges. """
+    return [curve.neutral_element()] + _points_by_x_range(curve, _points_in_range, max_workers)
+
+
+def n_torsion_points(curve, n, max_workers=None):
+    """ Points P of the curve such that n · P = O (in the order of get_all_points). """
+    points = _points_by_x_range(curve, functools.partial(_points_in_range, n=n), max_workers)
+    return [curve.neutral_element()] + points
+
+
+def _points_by_x_range(curve, function, max_workers):
+    max_workers = max_workers or os.cpu_count()
+    size = curve.field.order()
+    step = -(-size // (4 * max_workers))
+    ranges = [(curve, start, min(start + step, size)) for start in range(0, size, step)]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        chunks = list(executor.map(function, ranges))
+    return [_decode_point(curve, P) for chunk in chunks for P in chunk]
+
+
+def _map_chunks(function, items, max_workers):
+    """ Concatenation of function(chunk) for contiguous chunks of items (about 4 per worker, to balance the load). """
+    max_workers = max_workers or os.cpu_count()
+    step = -(-len(items) // (4 * max_workers))
+    chunks = [items[start:start + step] for start in range(0, len(items), step)]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return [result for chunk_results in executor.map(function, chunks) for result in chunk_results]
+
+
+# Worker functions (module-level, so that they can be pickled)
+
+def _pairings(pairs, n, pairing):
+    pairing_function = weil_pairing if pairing == 'weil' else tate_pairing
+    return [pairing_function(P, Q, n).coefficients for P, Q in pairs]
+
+
+def _scalar_muls(terms):
+    return [_encode_point(k * P) for P, k in terms]
+
+
+def _points_in_range(arguments, n=None):
+    """ Encoded points (other than O) with x of index in [start, stop) among field_elements(), whose order divides n
+    (if given). """
+    curve, start, stop = arguments
+    field = curve.field
+    points = []
+    for index in range(start, stop):
+        # Coefficients of the index-th element, whose first coefficient varies the slowest
+        x = field.from_coefficients(*(index // field.prime ** k % field.prime for k in reversed(range(field.degree))))
+        for y in field.square_root(x ** 3 + curve.a * x + curve.b):
+            P = curve.point(x, y, check_belongs=False)
+            if n is None or (n * P).is_infinity():
+                points.append(_encode_point(P))
+    return points
+
+
+def _encode_point(P):
+    return None if P.is_infinity() else (P.x.coefficients, P.y.coefficients)
+
+
+def _decode_point(curve, encoded):
+    if encoded is None:
+        return curve.neutral_element()
+    x, y = encoded
+    element = curve.field.element_class._trusted     # Coefficients were already reduced by the worker
+    return curve.point(element(curve.field, *x), element(curve.field, *y), check_belongs=False)
@@ -1,74 +1,289 @@
-def h(curve, P, Q, X):
-    """ Returns (p, q) for function h_{P,Q}(X) = p/q, as in Miller's algorithm for n-th Weil pairing. """
-    if P.x is None or Q.x is None:
-        # Special case for O, since h_{O,·}(X) = h_{·,O}(X) has no divisors.
-        return curve.field.from_coefficients(1), curve.field.from_coefficients(1)
-    lmbd = curve.slope(P, Q)
-    if lmbd is not None:    # lmbd != infty
-        p = (X.y - P.y - lmbd * (X.x - P.x))
-        q = (X.x + P.x + Q.x - lmbd ** 2)
+def miller_lines(curve, P, n):
+    """ Returns the lines of Miller's algorithm for f_P, as in the n-th Weil pairing.
+
+    There is one list per bit of n (skipping the leading one), holding the line h_{T,T} and, if the bit is set, the line
+    h_{2T,P}. Each line is encoded as None if h = 1, as (None, x_T, None, None) if vertical (h = X.x - x_T), and as
+    (lmbd, x_T, y_T, -x_{T+U}) otherwise (h = (X.y - y_T - lmbd · (X.x - x_T)) / (X.x - x_{T+U})).
+    """
+    lines = []
+    T = P
+    for epsilon in bin(n)[3:]:    # Skip 0b prefix
+        line, T = _line(curve, T, T)
+        step = [line]
+        if epsilon == '1':
+            line, T = _line(curve, T, P)
+            step.append(line)
+        lines.append(step)
+    return lines
+
+
+def _line(curve, T, U):
+    """ Returns the encoded line h_{T,U}, and T + U computed in affine coordinates from the slope. """
+    if T.x is None:
+        return None, U
+    if U.x is None:
+        return None, T
+    lmbd = curve.slope(T, U)
+    if lmbd is None:    # lmbd = infty
+        return (None, T.x, None, None), curve.neutral_element()
+    x = lmbd ** 2 - T.x - U.x
+    y = lmbd * (T.x - x) - T.y
+    return (lmbd, T.x, T.y, -x), curve.point(x, y, check_belongs=False)
+
+
+def _evaluate_lines(curve, lines, X, skip_verticals=False):
+    """ Returns (numerator, denominator, zeros) for f(X) = numerator / denominator · 0^zeros, where f is given by lines.
+
+    Zero factors (which must cancel out) are counted apart. If skip_verticals, the values of the vertical lines
+    X.x - x_T are left out (denominator elimination).
+    """
+    numerator, denominator, zeros = _evaluate_product(curve, [(lines, X, 1, skip_verticals)])
+    return numerator, denominator, zeros[0]
+
+
+def _evaluate_product(curve, terms):
+    """ Returns (numerator, denominator, zeros) for prod_i f_i(X_i)^e_i = numerator / denominator, for the given terms
+    (lines_i, X_i, e_i, skip_verticals_i), where e_i = ±1 and f_i are given by lines_i (all of the same length).
+
+    All Miller loops are walked in lockstep, so the accumulated value is squared only once per step. The zero factors
+    of each f_i(X_i)^e_i (which must cancel out) are counted apart, in zeros[i].
+    """
+    field = curve.field
+    one = field.one
+    numerator = denominator = one
+    zeros = [0] * len(terms)
+    n_steps = len(terms[0][0]) if terms else 0
+    for i in range(n_steps):
+        # Compute f = f^2 * h_{T,T} (and f = f * h_{T,P}), for each term
+        numerator, denominator = field.square(numerator), field.square(denominator)
+        for k, (lines, X, exponent, skip_verticals) in enumerate(terms):
+            zeros[k] *= 2
+            for line in lines[i]:
+                if line is None:
+                    continue
+                lmbd, x, y, c = line
+                if lmbd is None:
+                    p, q = (one if skip_verticals else X.x - x), one
+                else:
+                    p, q = X.y - y - lmbd * (X.x - x), (one if skip_verticals else X.x + c)
+                if exponent < 0:
+                    p, q = q, p
+                numerator, denominator, zeros[k] = _multiply_factor(numerator, denominator, zeros[k], p, q)
+    return numerator, denominator, zeros
+
+
+def _multiply_factor(numerator, denominator, zeros, p, q):
+    """ Multiply f = numerator / denominator · 0^zeros by p / q. """
+    if p == 0:
+        zeros += 1
+    else:
+        numerator = numerator * p
+    if q == 0:
+        zeros -= 1
     else:
-        p = X.x - P.x
-        q = curve.field.from_coefficients(1)
-    return p, q
+        denominator = denominator * q
+    return numerator, denominator, zeros
+
+
+def miller_loop(curve, P, Xs, n):
+    """ Returns [f_P(X) for X in Xs], walking the chain of multiples of P (and their slopes) only once. """
+    return _evaluate_at_points(curve, miller_lines(curve, P, n), Xs, P, n)
+
+
+def _evaluate_at_points(curve, lines, Xs, P, n):
+    numerators, denominators = [], []
+    for X in Xs:
+        numerator, denominator, zeros = _evaluate_lines(curve, lines, X)
+        if zeros != 0:
+            raise ValueError(f'{X=} is a zero or pole of f_P (for {P=}, {n=}).')
+        numerators.append(numerator)
+        denominators.append(denominator)
+    return [numerator * inverse for numerator, inverse in zip(numerators, curve.field.batch_inverse(denominators))]
 
 
 def f(curve, P, X, n):
     """ Returns function f_P(X), as in Miller's algorithm for n-th Weil pairing. """
-    T = P
-    # Encoding "f = p1^x1 * p2^x2 / q1^y1 * q2^y2" with f_terms = {p1: x1, p2: x2, q1: -y1, q2: -y2}
-    f_terms = {}
-    for epsilon in bin(n)[3:]:    # Skip 0b prefix
-        # Compute f = f^2 * h_{T,T}
-        p, q = h(curve, T, T, X)
-        f_terms = {factor: 2*ex for factor, ex in f_terms.items()}  # f = f^2
-        f_terms[p] = f_terms.get(p, 0) + 1                          # f = f * h_{T,T}
-        f_terms[q] = f_terms.get(q, 0) - 1
-        # Double T
-        T = T + T
-        if epsilon == '1':
-            # Compute f = f * h_{T,P}
-            p, q = h(curve, T, P, X)
-            f_terms[p] = f_terms.get(p, 0) + 1  # f = f * h_{T,T}
-            f_terms[q] = f_terms.get(q, 0) - 1
-            # Add T to P
-            T = T + P
-    # Remove 0-factors, ensuring their total multiplicity is 0.
-    assert f_terms.pop(curve.field.from_coefficients(0), 0) == 0
-    # Compute f(X)
-    f_eval = curve.field.from_coefficients(1)
-    for factor, ex in f_terms.items():
-        f_eval = f_eval * (curve.field.from_coefficients(factor) ** ex)
-    return f_eval
+    return miller_loop(curve, P, [X], n)[0]
+
+
+class PairingPrecomputation:
+    """ Miller loop lines (slopes and multiples T of P) for pairings e_n(P, ·) with a fixed first argument P.
+
+    Later pairings with the same P only evaluate the stored lines at the new points.
+    """
+    def __init__(self, P, n):
+        self.P = P
+        self.n = n
+        self.curve = P.curve
+        if n * P != self.curve.neutral_element():
+            raise ValueError(f'{P=} is not in the n-torsion subgroup of E(n) (order(P) does not divide {n})')
+        self.lines = miller_lines(self.curve, P, n)
+
+    def evaluate(self, Xs):
+        """ Returns [f_P(X) for X in Xs]. """
+        return _evaluate_at_points(self.curve, self.lines, Xs, self.P, self.n)
+
+    def weil_pairing(self, Q, S=None):
+        """ Computes Weil pairing e_n(P, Q) with n-th root unities. """
+        P, n, curve = self.P, self.n, self.curve
+
+        # Sanity checks
+        if P.curve != Q.curve or (S is not None and P.curve != S.curve):
+            raise ValueError('All points must belong to the same curve.')
+        if n * Q != curve.neutral_element():
+            raise ValueError(f'{Q=} is not in the n-torsion subgroup of E(n) (order(Q) does not divide {n})')
+
+        # Find a suitable S point not in <P, Q>
+        if S is None:
+            for S in curve.point_generator():
+                if n * S != curve.neutral_element():
+                    # S's order does not divide n, implying S is not in <P, Q>.
+                    break
+        if S is None:   # still None
+            raise ValueError('No suitable S point found -> subgroup generated by P and Q is the whole group.')
+        terms = self._weil_terms(Q, S)
+        numerator, denominator, zeros = _evaluate_product(curve, terms)
+        if any(z != 0 for z in zeros):
+            raise ValueError(f'{S=} is not suitable: it is a zero or pole of f_P or f_Q (for {P=}, {Q=}, {n=}).')
+        result = numerator / denominator
+        if result ** n != 1:
+            raise ValueError(f'Unexpected result: e_{n}({P}, {Q}; {S=}) = {result}, but ({result})^{n} = {result ** n} != 1')
+        return result
+
+    def _weil_terms(self, Q, S):
+        """ Terms of e_n(P, Q) = (f_P(Q+S) / f_P(S)) / (f_Q(P-S) / f_Q(-S)), for _evaluate_product. """
+        lines_Q = miller_lines(self.curve, Q, self.n)
+        return [
+            (self.lines, Q + S, 1, False),
+            (self.lines, S, -1, False),
+            (lines_Q, self.P - S, -1, False),
+            (lines_Q, -S, 1, False),
+        ]
+
+    def tate_pairing(self, Q, S=None):
+        """ Computes the reduced Tate pairing f_P(D_Q)^((q-1)/n), for q the size of the field, with n-th root unities.
+
+        If P has coordinates in F_p and n does not divide p - 1 (embedding degree > 1), D_Q = (Q) - (O) and only
+        f_P(Q) is needed (and the pairing is 1 if Q also has coordinates in F_p, as f_P(Q) then lies in F_p^*).
+        Otherwise D_Q = (Q + S) - (S), for some S which is not a zero or pole of f_P.
+        """
+        P, n, curve = self.P, self.n, self.curve
+        field = curve.field
+
+        # Sanity checks
+        if P.curve != Q.curve or (S is not None and P.curve != S.curve):
+            raise ValueError('All points must belong to the same curve.')
+        if (field.order() - 1) % n != 0:
+            raise ValueError(f'{field} does not contain the {n}-th roots of unity ({n} does not divide {field.order() - 1}).')
+        if Q.x is None:
+            return field.from_coefficients(1)
+
+        if self.needs_auxiliary_point():
+            # Find a suitable S point (unless given), such that neither Q + S nor S are in <P>
+            if S is None:
+                S = _find_auxiliary_point(curve, [Q], n)
+        terms = self._tate_terms(Q, S)
+        numerator, denominator, zeros = _evaluate_product(curve, terms)
+        if any(z != 0 for z in zeros):
+            raise ValueError(f'Degenerate Tate pairing: {Q=} (or {S=}) is a zero or pole of f_P (for {P=}, {n=}).')
+        return final_exponentiation(field, numerator / denominator, n)
+
+    def needs_auxiliary_point(self):
+        """ Whether Tate pairings need D_Q = (Q + S) - (S): unless P has coordinates in F_p and n does not divide p - 1. """
+        P, field = self.P, self.curve.field
+        P_in_prime_subfield = P.x is None or (field.frobenius(P.x) == P.x and field.frobenius(P.y) == P.y)
+        return not P_in_prime_subfield or (field.prime - 1) % self.n == 0
+
+    def _tate_terms(self, Q, S):
+        """ Terms of f_P(D_Q) for _evaluate_product, where S is only used if needs_auxiliary_point(). """
+        if Q.x is None:
+            return []
+        if not self.needs_auxiliary_point():
+            # Denominator elimination: if Q.x also lies in F_p, the vertical lines take values in F_p^*, which are sent
+            # to 1 by the final exponentiation (as p-1 divides (q-1)/n).
+            field = self.curve.field
+            x_in_prime_subfield = field.frobenius(Q.x) == Q.x
+            if x_in_prime_subfield and field.frobenius(Q.y) == Q.y:
+                # f_P(Q) lies in F_p^* too, even if Q is in <P> (where the lines evaluated without their vertical
+                # poles would vanish): the term is 1
+                return []
+            return [(self.lines, Q, 1, x_in_prime_subfield)]
+        return [(self.lines, Q + S, 1, False), (self.lines, S, -1, False)]
+
+
+def _find_auxiliary_point(curve, Qs, n):
+    """ Returns a point S such that neither S nor Q + S (for Q in Qs) are in the n-torsion subgroup. """
+    for S in curve.point_generator():
+        if n * S != curve.neutral_element() and all(n * (Q + S) != curve.neutral_element() for Q in Qs):
+            # The orders of S and Q + S do not divide n, implying they are not in <P>.
+            return S
+    raise ValueError('No suitable S point found -> Q + S or S are in the n-torsion subgroup for all S.')
 
 
 def weil_pairing(P, Q, n, S=None):
     """ Computes Weil pairing with n-th root unities. """
+    if P.curve != Q.curve or (S is not None and P.curve != S.curve):
+        raise ValueError('All points must belong to the same curve.')
+    return PairingPrecomputation(P, n).weil_pairing(Q, S)
+
 
-    # Sanity checks
-    curve = P.curve
+def tate_pairing(P, Q, n, S=None):
+    """ Computes the reduced Tate pairing with n-th root unities (see PairingPrecomputation.tate_pairing). """
     if P.curve != Q.curve or (S is not None and P.curve != S.curve):
         raise ValueError('All points must belong to the same curve.')
-    if n * P != curve.neutral_element():
-        raise ValueError(f'{P=} is not in the n-torsion subgroup of E(n) (order(P) does not divide {n})')
-    if n * Q != curve.neutral_element():
-        raise ValueError(f'{Q=} is not in the n-torsion subgroup of E(n) (order(Q) does not divide {n})')
-
-    # Find a suitable S point not in <P, Q>
-    if S is None:
-        for S in curve.point_generator():
-            if n * S != curve.neutral_element():
-                # S's order does not divide n, implying S is not in <P, Q>.
-                break
-    if S is None:   # still None
-        raise ValueError('No suitable S point found -> subgroup generated by P and Q is the whole group.')
-    terms = [
-         f(curve, P=P, X=Q+S, n=n),
-         f(curve, P=P, X=S, n=n),
-         f(curve, P=Q, X=P-S, n=n),
-         f(curve, P=Q, X=-S, n=n)
-    ]
-    result = (terms[0]/terms[1]) / (terms[2]/terms[3])
+    return PairingPrecomputation(P, n).tate_pairing(Q, S)
+
+
+def final_exponentiation(field, value, n):
+    """ Computes value^((q-1)/n), for q the size of the field. """
+    p = field.prime
+    if field.order() == p ** 2 and (p + 1) % n == 0:
+        # value^((p^2-1)/n) = (value^p / value)^((p+1)/n), where value^p is given by the Frobenius map.
+        # The result has norm 1, so its powers are cheaper to compute.
+        value = field.frobenius(value) / value
+        return field.unitary_power(value, (p + 1) // n)
+    return value ** ((field.order() - 1) // n)
+
+
+def multi_pairing(pairs, n, S=None, pairing='weil'):
+    """ Computes the product of the pairings e_n(P_i, Q_i), for (P_i, Q_i) in pairs, with n-th root unities.
+
+    The Miller loops run in lockstep, sharing the squarings of the accumulated value, and the final division (and
+    exponentiation, for pairing='tate') is performed once for the product.
+    """
+    if pairing not in ('weil', 'tate'):
+        raise ValueError(f'Unknown {pairing=} (expected "weil" or "tate").')
+    pairs = list(pairs)
+    if not pairs:
+        raise ValueError('At least one pair of points is needed.')
+    curve = pairs[0][0].curve
+    field = curve.field
+    if any(P.curve != curve or Q.curve != curve for P, Q in pairs) or (S is not None and S.curve != curve):
+        raise ValueError('All points must belong to the same curve.')
+    if pairing == 'tate' and (field.order() - 1) % n != 0:
+        raise ValueError(f'{field} does not contain the {n}-th roots of unity ({n} does not divide {field.order() - 1}).')
+    precomputations = [PairingPrecomputation(P, n) for P, _ in pairs]
+
+    terms = []
+    if pairing == 'weil':
+        if any(n * Q != curve.neutral_element() for _, Q in pairs):
+            raise ValueError(f'Some Q is not in the n-torsion subgroup of E(n) (order(Q) does not divide {n})')
+        if S is None:
+            S = _find_auxiliary_point(curve, [], n)
+        for precomputation, (_, Q) in zip(precomputations, pairs):
+            terms += precomputation._weil_terms(Q, S)
+    else:
+        if S is None and any(pre.needs_auxiliary_point() for pre in precomputations):
+            S = _find_auxiliary_point(curve, [Q for _, Q in pairs], n)
+        for precomputation, (_, Q) in zip(precomputations, pairs):
+            terms += precomputation._tate_terms(Q, S)
+
+    numerator, denominator, zeros = _evaluate_product(curve, terms)
+    if any(z != 0 for z in zeros):
+        raise ValueError(f'Degenerate pairing product: some point is a zero or pole of the Miller functions ({S=}).')
+    result = numerator / denominator
+    if pairing == 'tate':
+        return final_exponentiation(field, result, n)
     if result ** n != 1:
-        raise ValueError(f'Unexpected result: e_{n}({P}, {Q}; {S=}) = {result}, but ({result})^{n} = {result ** n} != 1')
+        raise ValueError(f'Unexpected result: product of e_{n} = {result}, but ({result})^{n} = {result ** n} != 1')
     return result
@@ -0,0 +1,227 @@
+import numpy as np
+
+
+class FieldArray:
+    """ Vector of elements of a finite field, stored as a (k, degree) numpy array of reduced coefficients.
+
+    Coefficients are int64 while products of two of them fit (p < 2^31), and Python integers (object) otherwise.
+    Arithmetic is elementwise, and other operands may be FieldArrays of the same length, field elements or integers.
+    """
+    def __init__(self, field, coefficients):
+        self.field = field
+        self.coefficients = coefficients
+
+    @staticmethod
+    def dtype(field):
+        return np.int64 if field.prime < 2 ** 31 else object
+
+    @classmethod
+    def from_coefficients(cls, field, coefficients):
+        """ Array from integer coefficients of shape (k, degree) (or (k, ) for prime fields), reduced modulo p. """
+        coefficients = np.asarray(coefficients, dtype=cls.dtype(field))
+        if coefficients.ndim == 1:
+            coefficients = coefficients.reshape(-1, 1)
+        if coefficients.shape[1] < field.degree:
+            padding = np.zeros((coefficients.shape[0], field.degree - coefficients.shape[1]), dtype=coefficients.dtype)
+            coefficients = np.concatenate([coefficients, padding], axis=1)
+        return cls(field, coefficients % field.prime)
+
+    @classmethod
+    def from_elements(cls, field, elements):
+        coefficients = [field.from_coefficients(element).coefficients for element in elements]
+        return cls.from_coefficients(field, np.array(coefficients, dtype=cls.dtype(field)).reshape(-1, field.degree))
+
+    def to_elements(self):
+        element = self.field.element_class._trusted
+        return [element(self.field, *row) for row in self.coefficients.tolist()]
+
+    def __len__(self):
+        return self.coefficients.shape[0]
+
+    def __iter__(self):
+        return iter(self.to_elements())
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return self.field.element_class._trusted(self.field, *self.coefficients[index].tolist())
+        return FieldArray(self.field, self.coefficients[index])
+
+    def _sanitize_other(self, other):
+        """ Coefficients of other, as an array broadcastable against self.coefficients. """
+        if isinstance(other, FieldArray):
+            if other.field != self.field:
+                raise ValueError('Fields do not match')
+            return other.coefficients
+        element = self.field.from_coefficients(other)
+        return np.array([element.coefficients], dtype=self.coefficients.dtype)
+
+    def __add__(self, other):
+        return FieldArray(self.field, (self.coefficients + self._sanitize_other(other)) % self.field.prime)
+
+    def __radd__(self, other):
+        return self + other
+
+    def __sub__(self, other):
+        return FieldArray(self.field, (self.coefficients - self._sanitize_other(other)) % self.field.prime)
+
+    def __rsub__(self, other):
+        return FieldArray(self.field, (self._sanitize_other(other) - self.coefficients) % self.field.prime)
+
+    def __neg__(self):
+        return FieldArray(self.field, (-self.coefficients) % self.field.prime)
+
+    def __mul__(self, other):
+        return FieldArray(self.field, self._multiply(self.coefficients, self._sanitize_other(other)))
+
+    def __rmul__(self, other):
+        return self * other
+
+    def _multiply(self, A, B):
+        p = self.field.prime
+        if self.field.degree == 1:
+            return A * B % p
+        # Take into account that alpha^2 = - alpha - 1
+        a0b0 = A[:, 0] * B[:, 0] % p
+        a1b1 = A[:, 1] * B[:, 1] % p
+        a0b1 = A[:, 0] * B[:, 1] % p
+        a1b0 = A[:, 1] * B[:, 0] % p
+        return np.stack([(a0b0 - a1b1) % p, (a0b1 + a1b0 - a1b1) % p], axis=1)
+
+    def __pow__(self, other):
+        assert isinstance(other, int)
+        base = self if other >= 0 else self.inverse()
+        # double-and-add exponentiation, on the whole array at once
+        result = np.zeros_like(self.coefficients)
+        result[:, 0] = 1
+        for bit in bin(abs(other))[2:]:    # Avoid '0b' prefix
+            result = self._multiply(result, result)
+            if bit == '1':
+                result = self._multiply(result, base.coefficients)
+        return FieldArray(self.field, result)
+
+    def norm(self):
+        """ Norm into F_p of each element, as a 1-d array (the element itself, for prime fields). """
+        p = self.field.prime
+        if self.field.degree == 1:
+            return self.coefficients[:, 0]
+        a, b = self.coefficients[:, 0], self.coefficients[:, 1]
+        return (a * a % p - a * b % p + b * b % p) % p
+
+    def inverse(self):
+        p = self.field.prime
+        norm = self.norm()
+        if np.any(norm == 0):
+            raise ZeroDivisionError('Could not invert an array with zero elements.')
+        inv_norm = _power_mod_p(norm, p - 2, p)
+        if self.field.degree == 1:
+            return FieldArray(self.field, inv_norm.reshape(-1, 1))
+        # Compute 1/element as (a+b*alpha^2)/ (a^2 - ab + b^2), where alpha^2 = -alpha - 1
+        a, b = self.coefficients[:, 0], self.coefficients[:, 1]
+        return FieldArray(self.field, np.stack([(a - b) % p * inv_norm % p, (-b) % p * inv_norm % p], axis=1))
+
+    def __truediv__(self, other):
+        if not isinstance(other, FieldArray):
+            other = FieldArray(self.field, self._sanitize_other(other))
+        return self * other.inverse()
+
+    def __rtruediv__(self, other):
+        return self.inverse() * other
+
+    def __eq__(self, other):
+        """ Elementwise comparison, as a boolean numpy array. """
+        try:
+            other = self._sanitize_other(other)
+        except ValueError:
+            return np.zeros(len(self), dtype=bool)
+        return np.all(self.coefficients == other, axis=1)
+
+    def __ne__(self, other):
+        return ~(self == other)
+
+    __hash__ = None
+
+    def is_square(self):
+        """ Boolean numpy array, True for the elements which are squares in the field. """
+        p = self.field.prime
+        if p == 2:
+            return np.ones(len(self), dtype=bool)
+        # An element of F_p(alpha) is a square iff its norm is a square in F_p (Euler's criterion)
+        return _is_square_mod_p(self.norm(), p)
+
+    def square_root(self):
+        """ Some square root of each element (which must all be squares), as a FieldArray.
+
+        Computed on the whole array at once: by Tonelli-Shanks in F_p, and in F_p(alpha) from the square roots (in F_p)
+        of the norm and of the trace of the root, as in FiniteFieldExtension3thPrimitiveRoot.some_square_root.
+        """
+        if not np.all(self.is_square()):
+            raise ValueError('Not all elements are squares.')
+        p = self.field.prime
+        if self.field.degree == 1:
+            return FieldArray(self.field, _square_root_mod_p(self.coefficients[:, 0], p).reshape(-1, 1))
+        x, y = self.coefficients[:, 0], self.coefficients[:, 1]
+        # Elements of F_p (y = 0): either x or x / (-3) are squares in F_p, and (2·alpha + 1)^2 = -3
+        x_is_square = _is_square_mod_p(x, p)
+        x_root = _square_root_mod_p(np.where(x_is_square, x, x * pow(-3, -1, p) % p), p)
+        # Other elements: if z^2 = element, with m = norm(z) = ±sqrt(norm(element)) and s = trace(z), then
+        # s^2 = trace(element) + 2m and z · s = element + m, for the sign of m making trace(element) + 2m a nonzero
+        # square
+        norm_root = _square_root_mod_p(self.norm(), p)
+        trace = (2 * x - y) % p
+        candidate = (trace + 2 * norm_root) % p
+        m = np.where((candidate != 0) & _is_square_mod_p(candidate, p), norm_root, (-norm_root) % p)
+        trace_root = _square_root_mod_p((trace + 2 * m) % p, p)
+        inv_trace_root = _power_mod_p(trace_root, p - 2, p)
+        in_base_field = y == 0
+        return FieldArray(self.field, np.stack([
+            np.where(in_base_field, x_root, (x + m) % p * inv_trace_root % p),
+            np.where(in_base_field, np.where(x_is_square, 0, 2 * x_root % p), y * inv_trace_root % p),
+        ], axis=1))
+
+    def __repr__(self):
+        return f'FieldArray({self.to_elements()}, field={self.field})'
+
+
+def _power_mod_p(values, exp, p):
+    """ Elementwise values^exp mod p, for a 1-d array of integers. """
+    result = np.ones_like(values)
+    base = values % p
+    while exp > 0:
+        if exp & 1:
+            result = result * base % p
+        base = base * base % p
+        exp >>= 1
+    return result
+
+
+def _is_square_mod_p(values, p):
+    """ Elementwise Euler's criterion, as a boolean array (True for 0). """
+    return (values % p == 0) | (_power_mod_p(values, (p - 1) // 2, p) == 1)
+
+
+def _square_root_mod_p(values, p):
+    """ Elementwise square roots mod p, for a 1-d array of quadratic residues (or zeros). """
+    if p == 2:
+        return values % p
+    if p % 4 == 3:
+        return _power_mod_p(values, (p + 1) // 4, p)
+    # Tonelli-Shanks: write p - 1 = q · 2^s, with q odd, for a quadratic non-residue z, and c = z^q of order 2^s
+    q, s = p - 1, 0
+    while q % 2 == 0:
+        q, s = q // 2, s + 1
+    z = 2
+    while pow(z, (p - 1) // 2, p) != p - 1:
+        z += 1
+    c = pow(z, q, p)
+    # Keep r^2 = a · t, where the order of t divides 2^k, and halve the order of t (when needed) for k = s - 1, ..., 1
+    root, t = _power_mod_p(values, (q + 1) // 2, p), _power_mod_p(values, q, p)
+    for k in range(s - 1, 0, -1):
+        t_power = t
+        for _ in range(k - 1):
+            t_power = t_power * t_power % p
+        # Multiply t by c^(2^(s-k)), of order 2^k, where t^(2^(k-1)) = -1
+        needed = t_power == p - 1
+        b = pow(c, 1 << (s - k - 1), p)
+        root = np.where(needed, root * b % p, root)
+        t = np.where(needed, t * (b * b % p) % p, t)
+    return root
@@ -1,17 +1,42 @@
+import itertools
+import math
+import random
+
+import sympy
+
 from curves.finitegroup import FiniteGroup
+from fields.utils import INVERSION_METHODS
 
 
 class BaseFiniteField:
+    degree = None           # Number of coefficients of each element (i.e. dimension over F_p)
+    element_class = None    # Subclass of FieldElement
 
-    def __init__(self):
+    def __init__(self, precompute_square_roots=False, inversion='pow'):
+        # Precomputing a table of all square roots is only sensible for tiny fields
+        self.precompute_square_roots = precompute_square_roots
         self._square_roots = None
+        # Inversion modulo p, one of INVERSION_METHODS
+        if inversion not in INVERSION_METHODS:
+            raise ValueError(f'Unknown {inversion=} (expected one of {list(INVERSION_METHODS)}).')
+        self.inversion = inversion
+        self._inverse_mod_p = INVERSION_METHODS[inversion]
+        # Cached neutral elements (set by subclasses)
+        self.zero = None
+        self.one = None
+        self._multiplicative_generator = None
 
     def from_coefficients(self, *coefficients):
         raise NotImplementedError
 
-    def field_elements(self):
+    def field_elements(self, as_array=False):
+        """ List of all elements of the field (or a FieldArray, if as_array). """
         raise NotImplementedError
 
+    def random_element(self):
+        """ Uniformly random element of the field. """
+        return self.from_coefficients(*(random.randrange(self.prime) for _ in range(self.degree)))
+
     def addition(self, element_A, element_B):
         raise NotImplementedError
 
@@ -21,35 +46,132 @@ class BaseFiniteField:
     def multiplication(self, element_A, element_B):
         raise NotImplementedError
 
+    def square(self, element):
+        return self.multiplication(element, element)
+
     def inverse(self, element):
         raise NotImplementedError
 
+    def batch_inverse(self, elements):
+        """ Inverses of all elements, with a single field inversion and 3(k-1) multiplications (Montgomery's trick). """
+        elements = [self.from_coefficients(element) for element in elements]
+        if not elements:
+            return []
+        # prefix_products[i] = elements[0] · ... · elements[i]
+        prefix_products = [elements[0]]
+        for element in elements[1:]:
+            prefix_products.append(prefix_products[-1] * element)
+        inverse = self.inverse(prefix_products[-1])     # 1 / (elements[0] · ... · elements[i]), for i from k-1 down to 0
+        inverses = [None] * len(elements)
+        for i in range(len(elements) - 1, 0, -1):
+            inverses[i] = inverse * prefix_products[i - 1]
+            inverse = inverse * elements[i]
+        inverses[0] = inverse
+        return inverses
+
+    def order(self):
+        """ Number of elements in the field. """
+        raise NotImplementedError
+
+    def frobenius(self, element):
+        """ Frobenius map x -> x^p, for p the characteristic of the field. """
+        return element ** self.prime
+
+    def some_square_root(self, element):
+        """ Returns some r such that r^2 = element, or None if element is not a square. """
+        raise NotImplementedError
+
     def square_root(self, n):
-        if self._square_roots is None:
-            # Precompute all square roots in field
-            self._square_roots = {}
-            for element in self.field_elements():
-                squared = element * element
-                self._square_roots[squared] = self._square_roots.get(squared, []) + [element]
-        return self._square_roots.get(self.from_coefficients(n), [])
+        """ Returns all square roots of n in the field (sorted by their coefficients). """
+        element = self.from_coefficients(n)
+        if self.precompute_square_roots:
+            if self._square_roots is None:
+                # Precompute all square roots in field
+                self._square_roots = {}
+                for root in self.field_elements():
+                    self._square_roots.setdefault(root * root, []).append(root)
+            return self._square_roots.get(element, [])
+        root = self.some_square_root(element)
+        if root is None:
+            return []
+        elif root == 0:
+            return [root]
+        return sorted([root, -root], key=lambda r: r.coefficients)
+
+    def coefficient_size(self):
+        """ Number of bytes of each (big-endian) coefficient in the byte encoding of elements. """
+        return (self.prime.bit_length() + 7) // 8
+
+    def element_size(self):
+        """ Number of bytes of the encoding of an element: its coefficients, with fixed width. """
+        return self.degree * self.coefficient_size()
+
+    def from_bytes(self, data):
+        """ Element encoded by element.to_bytes(). """
+        size = self.coefficient_size()
+        if len(data) != self.degree * size:
+            raise ValueError(f'Expected {self.degree * size} bytes for an element of {self}, but got {len(data)}.')
+        coefficients = [int.from_bytes(data[i:i + size], 'big') for i in range(0, len(data), size)]
+        if any(c >= self.prime for c in coefficients):
+            raise ValueError(f'Coefficients {coefficients} are not reduced modulo {self.prime}.')
+        return self.element_class._trusted(self, *coefficients)
+
+    def encode_elements(self, elements):
+        """ Concatenated encodings of all elements, as a single bytes object. """
+        return b''.join(self.from_coefficients(element).to_bytes() for element in elements)
+
+    def decode_elements(self, buffer):
+        """ Elements encoded (by encode_elements) in a bytes-like object, read through a memoryview without copies. """
+        buffer, size = memoryview(buffer), self.element_size()
+        if len(buffer) % size != 0:
+            raise ValueError(f'Buffer length {len(buffer)} is not a multiple of the element size ({size} bytes).')
+        return [self.from_bytes(buffer[i:i + size]) for i in range(0, len(buffer), size)]
+
+    def multiplicative_generator(self):
+        """ Generator of the (cyclic) multiplicative group of the field, found once and cached. """
+        if self._multiplicative_generator is None:
+            q, p = self.order(), self.prime
+            if self.degree == 2:    # Factor q - 1 = (p - 1)(p + 1) by parts
+                prime_factors = sorted(set(sympy.primefactors(p - 1)) | set(sympy.primefactors(p + 1)))
+            else:
+                prime_factors = sympy.primefactors(q - 1)
+            for candidate in self._small_elements():
+                # candidate generates F_q^* iff candidate^((q-1)/r) != 1 for all primes r dividing q - 1
+                if candidate != 0 and all(candidate ** ((q - 1) // r) != 1 for r in prime_factors):
+                    self._multiplicative_generator = candidate
+                    break
+        return self._multiplicative_generator
+
+    def _small_elements(self):
+        """ Yield every element of the field, by increasing size of its largest coefficient. """
+        for bound in range(self.prime):
+            for coefficients in itertools.product(range(bound + 1), repeat=self.degree):
+                if bound in coefficients:
+                    yield self.from_coefficients(*coefficients)
 
     def nth_roots(self, n):
-        return [
-            element
-            for element in self.field_elements()
-            if (element ** n) == self.from_coefficients(1)
-        ]
+        """ All x such that x^n = 1 (sorted by their coefficients), as powers of g^((q-1)/gcd(n, q-1)). """
+        q = self.order()
+        d = math.gcd(n, q - 1)
+        root = self.multiplicative_generator() ** ((q - 1) // d)     # Primitive d-th root of unity
+        roots = [self.one]
+        for _ in range(d - 1):
+            roots.append(roots[-1] * root)
+        return sorted(roots, key=lambda r: r.coefficients)
 
     def primitive_nth_roots(self, n):
-        primitive_roots = self.nth_roots(n)
-        orders = {}
-        for root in primitive_roots:
-            orders[root] = 1
-            result = root
-            while result != self.from_coefficients(1):
-                result = result * root
-                orders[root] += 1
-        return [root for root, order in orders.items() if order == n]
+        """ All x of multiplicative order n (sorted by their coefficients), i.e. zeta^k for k coprime to n. """
+        q = self.order()
+        if (q - 1) % n != 0:
+            return []
+        root = self.multiplicative_generator() ** ((q - 1) // n)    # Primitive n-th root of unity
+        primitive_roots = []
+        power = self.one
+        for k in range(1, n + 1):
+            power = power * root
+            if math.gcd(k, n) == 1:
+                primitive_roots.append(power)
+        return sorted(primitive_roots, key=lambda r: r.coefficients)
 
     def group_nth_roots(self, n):
         return FiniteGroup(
@@ -61,12 +183,22 @@ class BaseFiniteField:
 
 
 class FieldElement:
-    """ Implement pair a + b · alpha, where alpha is a 3th primitive root of unity. """
-    def __init__(self, field, *coefficients):
-        if any(not isinstance(value, int) for value in coefficients):
-            raise ValueError(f'All coefficients must be integer (but {coefficients=}).')
-        self.coefficients = coefficients
-        self.field = field
+    """ Element of a finite field. Subclasses store the integer coefficients (exposed as the tuple coefficients). """
+    __slots__ = ('field', )
+
+    @classmethod
+    def _trusted(cls, field, *coefficients):
+        """ Build an element from reduced integer coefficients, skipping validation (for internal use by fields). """
+        raise NotImplementedError
+
+    @property
+    def coefficients(self):
+        raise NotImplementedError
+
+    def to_bytes(self):
+        """ Fixed-width encoding: each coefficient in big-endian order, with field.coefficient_size() bytes. """
+        size = self.field.coefficient_size()
+        return b''.join(c.to_bytes(size, 'big') for c in self.coefficients)
 
     def _sanitize_other(self, other):
         if isinstance(other, self.__class__) and self.field == other.field:
@@ -101,9 +233,10 @@ class FieldElement:
         base = self if other >= 0 else self.field.inverse(self)
         exp = abs(other)
         # double-and-add exponentiation:
-        result = 1
+        field = self.field
+        result = field.one
         for bit in bin(exp)[2:]:    # Avoid '0b' prefix
-            result = result * result
+            result = field.square(result)
             if bit == '1':
                 result = result * base
         return result
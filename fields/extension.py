@@ -1,65 +1,212 @@
-from fields.base import BaseFiniteField
-from fields.utils import bezout_identity_Z
-from fields.primeorder import FieldElement
+import numpy as np
+
+from fields.array import FieldArray
+from fields.base import BaseFiniteField, FieldElement
+from fields.utils import square_root_mod_prime, wnaf
+from fields.primeorder import PrimeFieldElement
+
+
+class ExtensionFieldElement(FieldElement):
+    """ Element a + b·α of F_p(α), stored directly as integers a, b in [0, p). """
+    __slots__ = ('a', 'b')
+
+    def __init__(self, field, a, b):
+        if not isinstance(a, int) or not isinstance(b, int):
+            raise ValueError(f'All coefficients must be integer (but {a=}, {b=}).')
+        self.field = field
+        self.a = a % field.prime
+        self.b = b % field.prime
+
+    @classmethod
+    def _trusted(cls, field, a, b):
+        element = object.__new__(cls)
+        element.field = field
+        element.a = a
+        element.b = b
+        return element
+
+    @property
+    def coefficients(self):
+        return self.a, self.b
+
+    # Fast paths for operations with elements of the very same field object; anything else goes through the generic
+    # FieldElement implementation.
+    def __add__(self, other):
+        field = self.field
+        if other.__class__ is ExtensionFieldElement and other.field is field:
+            prime = field.prime
+            return ExtensionFieldElement._trusted(field, (self.a + other.a) % prime, (self.b + other.b) % prime)
+        return FieldElement.__add__(self, other)
+
+    def __sub__(self, other):
+        field = self.field
+        if other.__class__ is ExtensionFieldElement and other.field is field:
+            prime = field.prime
+            return ExtensionFieldElement._trusted(field, (self.a - other.a) % prime, (self.b - other.b) % prime)
+        return FieldElement.__sub__(self, other)
+
+    def __mul__(self, other):
+        field = self.field
+        if other.__class__ is ExtensionFieldElement and other.field is field:
+            return field.multiplication(self, other)
+        elif other.__class__ is int:
+            prime = field.prime
+            return ExtensionFieldElement._trusted(field, self.a * other % prime, self.b * other % prime)
+        return FieldElement.__mul__(self, other)
+
+    def __radd__(self, other):
+        return self + other
+
+    def __rmul__(self, other):
+        return self * other
+
+    def __neg__(self):
+        prime = self.field.prime
+        return ExtensionFieldElement._trusted(self.field, -self.a % prime, -self.b % prime)
+
+    def __eq__(self, other):
+        if other.__class__ is ExtensionFieldElement and other.field is self.field:
+            return self.a == other.a and self.b == other.b
+        elif other.__class__ is int:
+            return self.b == 0 and self.a == other % self.field.prime
+        return FieldElement.__eq__(self, other)
+
+    def __hash__(self):
+        return hash(((self.a, self.b), self.field))
 
 
 class FiniteFieldExtension3thPrimitiveRoot(BaseFiniteField):
-    def __init__(self, prime):
-        super().__init__()
+    element_class = ExtensionFieldElement
+    degree = 2
+
+    def __init__(self, prime, precompute_square_roots=False, inversion='pow'):
+        super().__init__(precompute_square_roots=precompute_square_roots, inversion=inversion)
         self.prime = prime
         assert prime % 3 == 2, 'This implementation is only defined for primes p such that p % 3 == 2'
+        self.zero = ExtensionFieldElement._trusted(self, 0, 0)
+        self.one = ExtensionFieldElement._trusted(self, 1, 0)
 
     def from_coefficients(self, *coefficients):
-        if len(coefficients) == 1 and isinstance(coefficients[0], FieldElement):
+        if len(coefficients) == 1 and isinstance(coefficients[0], ExtensionFieldElement):
             if coefficients[0].field != self:
                 raise ValueError(f'Original field ({coefficients[0].field}) do not match this field ({self})')
             return coefficients[0]
-        elif len(coefficients) == 1 and isinstance(coefficients[0], FieldElement):
+        elif len(coefficients) == 1 and isinstance(coefficients[0], PrimeFieldElement):
             if coefficients[0].field.prime != self.prime:
                 raise ValueError(f'Original field ({coefficients[0].field}) do not match this field ({self})')
-            return FieldElement(self, coefficients[0].value, 0)
+            return ExtensionFieldElement._trusted(self, coefficients[0].value, 0)
         elif len(coefficients) == 1 and isinstance(coefficients[0], int):
-            return FieldElement(self, coefficients[0], 0)
+            return ExtensionFieldElement(self, coefficients[0], 0)
         elif len(coefficients) == 2 and all(isinstance(value, int) for value in coefficients):
-            return FieldElement(self, coefficients[0], coefficients[1])
+            return ExtensionFieldElement(self, coefficients[0], coefficients[1])
         raise ValueError(f'Not implemented for {coefficients=}')
 
-    def field_elements(self):
-        return [FieldElement(self, i, j)
+    def field_elements(self, as_array=False):
+        if as_array:
+            values = np.arange(self.prime, dtype=FieldArray.dtype(self))
+            return FieldArray.from_coefficients(self, np.stack([
+                np.repeat(values, self.prime),
+                np.tile(values, self.prime),
+            ], axis=1))
+        return [ExtensionFieldElement._trusted(self, i, j)
                 for i in range(self.prime)
                 for j in range(self.prime)]
 
     def addition(self, element_A, element_B):
-        return self.from_coefficients(
-            (element_A.coefficients[0] + element_B.coefficients[0]) % self.prime,
-            (element_A.coefficients[1] + element_B.coefficients[1]) % self.prime,
+        return ExtensionFieldElement._trusted(
+            self,
+            (element_A.a + element_B.a) % self.prime,
+            (element_A.b + element_B.b) % self.prime,
         )
 
     def negation(self, element):
-        return self.from_coefficients(
-            (-element.coefficients[0]) % self.prime,
-            (-element.coefficients[1]) % self.prime,
+        return ExtensionFieldElement._trusted(
+            self,
+            (-element.a) % self.prime,
+            (-element.b) % self.prime,
         )
 
     def multiplication(self, element_A, element_B):
-        # Take into account that alpha^2 = - alpha - 1
-        return self.from_coefficients(
-            (element_A.coefficients[0] * element_B.coefficients[0] - element_A.coefficients[1] * element_B.coefficients[1]) % self.prime,
-            (element_A.coefficients[0] * element_B.coefficients[1] + element_A.coefficients[1] * element_B.coefficients[0] - element_A.coefficients[1] * element_B.coefficients[1]) % self.prime,
-        )
+        # Take into account that alpha^2 = - alpha - 1, and compute a0·b1 + a1·b0 = (a0 + a1)(b0 + b1) - a0·b0 - a1·b1
+        # (Karatsuba), so that only 3 products are needed
+        v0 = element_A.a * element_B.a
+        v1 = element_A.b * element_B.b
+        m = (element_A.a + element_A.b) * (element_B.a + element_B.b)
+        return ExtensionFieldElement._trusted(self, (v0 - v1) % self.prime, (m - v0 - 2 * v1) % self.prime)
+
+    def square(self, element):
+        # (a + b·alpha)^2 = (a^2 - b^2) + (2ab - b^2)·alpha, with 2 products
+        a, b = element.a, element.b
+        return ExtensionFieldElement._trusted(self, (a - b) * (a + b) % self.prime, b * (2 * a - b) % self.prime)
 
     def inverse(self, element):
         # Compute 1/element as (a+b*alpha^2)/ (a^2 - ab + b^2), where alpha^2 = -alpha - 1
-        norm = element.coefficients[0] ** 2 - element.coefficients[0] * element.coefficients[1] + element.coefficients[1] ** 2
-        inv_norm, _, gcd = bezout_identity_Z(norm, self.prime)
-        assert gcd == 1, f'{norm} is not invertible: could not invert {element}.'
-        return self.from_coefficients(
-            (element.coefficients[0] - element.coefficients[1]) * inv_norm % self.prime,
-            (-element.coefficients[1]) * inv_norm % self.prime,
+        norm = element.a ** 2 - element.a * element.b + element.b ** 2
+        if norm % self.prime == 0:
+            raise ZeroDivisionError(f'{norm} is not invertible: could not invert {element}.')
+        inv_norm = self._inverse_mod_p(norm, self.prime)
+        return ExtensionFieldElement._trusted(
+            self,
+            (element.a - element.b) * inv_norm % self.prime,
+            (-element.b) * inv_norm % self.prime,
         )
 
+    def order(self):
+        return self.prime ** 2
+
+    def some_square_root(self, element):
+        p = self.prime
+        x, y = element.a, element.b
+        if y == 0:
+            # Every element of F_p is a square in F_p(alpha): either x or x / (-3) are squares in F_p, and
+            # (2·alpha + 1)^2 = -3
+            root = square_root_mod_prime(x, p)
+            if root is not None:
+                return ExtensionFieldElement._trusted(self, root, 0)
+            root = square_root_mod_prime(x * self._inverse_mod_p(-3, p), p)
+            return ExtensionFieldElement._trusted(self, root, 2 * root % p)
+        # If z^2 = element, with m = norm(z) = ±sqrt(norm(element)) and s = trace(z), then s^2 = trace(element) + 2m and
+        # z · s = element + m. Hence z = (element + m) / s, for the sign of m making trace(element) + 2m a square.
+        norm_root = square_root_mod_prime(x * x - x * y + y * y, p)
+        if norm_root is None:
+            return None
+        trace = 2 * x - y
+        for m in (norm_root, -norm_root):
+            s = square_root_mod_prime(trace + 2 * m, p)
+            if s:
+                inv_s = self._inverse_mod_p(s, p)
+                return ExtensionFieldElement._trusted(self, (x + m) * inv_s % p, y * inv_s % p)
+        return None
+
+    def frobenius(self, element):
+        # (a + b·alpha)^p = a + b·alpha^p = a + b·alpha^2 (since p % 3 == 2), where alpha^2 = - alpha - 1
+        return ExtensionFieldElement._trusted(
+            self,
+            (element.a - element.b) % self.prime,
+            (-element.b) % self.prime,
+        )
+
+    def unitary_power(self, element, exp):
+        """ element^exp, for an element of norm 1 (such as the values of pairings, or x^p / x for any x != 0).
+
+        The element has order dividing p + 1 and its inverse is its conjugate (i.e. its Frobenius image), so the
+        exponent is reduced modulo p + 1 and the negative digits of its non-adjacent form cost no inversions.
+        """
+        a, b = element.a, element.b
+        assert (a * a - a * b + b * b) % self.prime == 1, f'{element} does not have norm 1'
+        exp %= self.prime + 1
+        conjugate = self.frobenius(element)
+        result = self.one
+        for digit in reversed(wnaf(exp, 2)):
+            result = self.square(result)
+            if digit == 1:
+                result = self.multiplication(result, element)
+            elif digit == -1:
+                result = self.multiplication(result, conjugate)
+        return result
+
     def __eq__(self, other):
-        return self.prime == other.prime
+        return isinstance(other, FiniteFieldExtension3thPrimitiveRoot) and self.prime == other.prime
 
     def __hash__(self):
         return hash(self.prime)
@@ -1,39 +1,132 @@
+import numpy as np
+
+from fields.array import FieldArray
 from fields.base import BaseFiniteField, FieldElement
-from fields.utils import bezout_identity_Z
+from fields.utils import square_root_mod_prime
+
+
+class PrimeFieldElement(FieldElement):
+    """ Element of F_p, stored directly as an integer in [0, p). """
+    __slots__ = ('value', )
+
+    def __init__(self, field, value):
+        if not isinstance(value, int):
+            raise ValueError(f'All coefficients must be integer (but {value=}).')
+        self.field = field
+        self.value = value % field.prime
+
+    @classmethod
+    def _trusted(cls, field, value):
+        element = object.__new__(cls)
+        element.field = field
+        element.value = value
+        return element
+
+    @property
+    def coefficients(self):
+        return (self.value, )
+
+    # Fast paths for operations with elements of the very same field object or with integers; anything else goes
+    # through the generic FieldElement implementation.
+    def __add__(self, other):
+        field = self.field
+        if other.__class__ is PrimeFieldElement and other.field is field:
+            return PrimeFieldElement._trusted(field, (self.value + other.value) % field.prime)
+        elif other.__class__ is int:
+            return PrimeFieldElement._trusted(field, (self.value + other) % field.prime)
+        return FieldElement.__add__(self, other)
+
+    def __sub__(self, other):
+        field = self.field
+        if other.__class__ is PrimeFieldElement and other.field is field:
+            return PrimeFieldElement._trusted(field, (self.value - other.value) % field.prime)
+        elif other.__class__ is int:
+            return PrimeFieldElement._trusted(field, (self.value - other) % field.prime)
+        return FieldElement.__sub__(self, other)
+
+    def __mul__(self, other):
+        field = self.field
+        if other.__class__ is PrimeFieldElement and other.field is field:
+            return PrimeFieldElement._trusted(field, self.value * other.value % field.prime)
+        elif other.__class__ is int:
+            return PrimeFieldElement._trusted(field, self.value * other % field.prime)
+        return FieldElement.__mul__(self, other)
+
+    def __radd__(self, other):
+        return self + other
+
+    def __rmul__(self, other):
+        return self * other
+
+    def __neg__(self):
+        return PrimeFieldElement._trusted(self.field, -self.value % self.field.prime)
+
+    def __pow__(self, other):
+        assert isinstance(other, int)
+        prime = self.field.prime
+        if other < 0:
+            return PrimeFieldElement._trusted(self.field, pow(self.field.inverse(self).value, -other, prime))
+        return PrimeFieldElement._trusted(self.field, pow(self.value, other, prime))
+
+    def __eq__(self, other):
+        if other.__class__ is PrimeFieldElement and other.field is self.field:
+            return self.value == other.value
+        elif other.__class__ is int:
+            return self.value == other % self.field.prime
+        return FieldElement.__eq__(self, other)
+
+    def __hash__(self):
+        return hash(((self.value, ), self.field))
 
 
 class FiniteFieldPrimeOrder(BaseFiniteField):
-    def __init__(self, prime):
-        super().__init__()
+    element_class = PrimeFieldElement
+    degree = 1
+
+    def __init__(self, prime, precompute_square_roots=False, inversion='pow'):
+        super().__init__(precompute_square_roots=precompute_square_roots, inversion=inversion)
         self.prime = prime
+        self.zero = PrimeFieldElement._trusted(self, 0)
+        self.one = PrimeFieldElement._trusted(self, 1)
 
     def from_coefficients(self, *coefficients):
         assert len(coefficients) == 1, 'Only one value can be converted to a field element.'
         value = coefficients[0]
-        if isinstance(value, FieldElement) and value.field == self:
+        if isinstance(value, PrimeFieldElement) and value.field == self:
             return value
         elif isinstance(value, FieldElement):
             raise ValueError(f'Original field ({value.field}) do not match this field ({self})')
-        return FieldElement(self, value)
+        return PrimeFieldElement(self, value)
 
-    def field_elements(self):
-        return [FieldElement(self, i) for i in range(self.prime)]
+    def field_elements(self, as_array=False):
+        if as_array:
+            return FieldArray.from_coefficients(self, np.arange(self.prime, dtype=FieldArray.dtype(self)))
+        return [PrimeFieldElement._trusted(self, i) for i in range(self.prime)]
 
     def addition(self, element_A, element_B):
-        return self.from_coefficients((element_A.coefficients[0] + element_B.coefficients[0]) % self.prime)
+        return PrimeFieldElement._trusted(self, (element_A.value + element_B.value) % self.prime)
     
     def negation(self, element):
-        return self.from_coefficients((-element.coefficients[0]) % self.prime)
+        return PrimeFieldElement._trusted(self, (-element.value) % self.prime)
     
     def multiplication(self, element_A, element_B):
-        return self.from_coefficients((element_A.coefficients[0] * element_B.coefficients[0]) % self.prime)
+        return PrimeFieldElement._trusted(self, (element_A.value * element_B.value) % self.prime)
     
     def inverse(self, element):
-        alpha, beta, gcd = bezout_identity_Z(element.coefficients[0], self.prime)
-        return self.from_coefficients(alpha % self.prime)
+        return PrimeFieldElement._trusted(self, self._inverse_mod_p(element.value, self.prime))
+
+    def order(self):
+        return self.prime
+
+    def some_square_root(self, element):
+        root = square_root_mod_prime(element.value, self.prime)
+        return None if root is None else PrimeFieldElement._trusted(self, root)
+
+    def frobenius(self, element):
+        return element
 
     def __eq__(self, other):
-        return self.prime == other.prime
+        return isinstance(other, FiniteFieldPrimeOrder) and self.prime == other.prime
 
     def __hash__(self):
         return hash(self.prime)
@@ -1,7 +1,100 @@
 def bezout_identity_Z(a, b):
     # Returns alpha, beta, gcd for a * alpha + b * beta = gcd(a, b)
-    if b == 0:
-        return 1, 0, a
-    else:
-        alpha, beta, gcd = bezout_identity_Z(b, a % b)
-        return beta, alpha - (a // b) * beta, gcd
+    # Iterative extended Euclidean algorithm, keeping the invariants a * alpha + b * beta = gcd (and for next_*)
+    alpha, next_alpha = 1, 0
+    beta, next_beta = 0, 1
+    gcd, next_gcd = a, b
+    while next_gcd != 0:
+        quotient = gcd // next_gcd
+        alpha, next_alpha = next_alpha, alpha - quotient * next_alpha
+        beta, next_beta = next_beta, beta - quotient * next_beta
+        gcd, next_gcd = next_gcd, gcd - quotient * next_gcd
+    return alpha, beta, gcd
+
+
+def inverse_mod_euclid(a, p):
+    """ Inverse of a modulo p, with the extended Euclidean algorithm. """
+    alpha, _, gcd = bezout_identity_Z(a % p, p)
+    if gcd != 1:
+        raise ZeroDivisionError(f'{a} is not invertible modulo {p}.')
+    return alpha % p
+
+
+def inverse_mod_pow(a, p):
+    """ Inverse of a modulo p, with Python's built-in pow(a, -1, p). """
+    try:
+        return pow(a, -1, p)
+    except ValueError:
+        raise ZeroDivisionError(f'{a} is not invertible modulo {p}.') from None
+
+
+def inverse_mod_fermat(a, p):
+    """ Inverse of a modulo p, for p prime, as a^(p-2) (Fermat's little theorem). """
+    if a % p == 0:
+        raise ZeroDivisionError(f'{a} is not invertible modulo {p}.')
+    return pow(a, p - 2, p)
+
+
+INVERSION_METHODS = {
+    'euclid': inverse_mod_euclid,
+    'pow': inverse_mod_pow,
+    'fermat': inverse_mod_fermat,
+}
+
+
+def window_size(bit_length):
+    """ Window width for windowed exponentiation, balancing precomputation against additions for the exponent size. """
+    if bit_length <= 8:
+        return 2
+    elif bit_length <= 32:
+        return 3
+    elif bit_length <= 128:
+        return 4
+    return 5
+
+
+def wnaf(k, window):
+    """ Width-w non-adjacent form of k >= 0: odd digits |d| < 2^(w-1), least significant first, at most one non-zero
+    digit every w consecutive ones. """
+    assert k >= 0 and window >= 2
+    modulus = 1 << window
+    digits = []
+    while k > 0:
+        if k & 1:
+            digit = k % modulus
+            if digit >= modulus // 2:
+                digit -= modulus
+            k -= digit
+        else:
+            digit = 0
+        digits.append(digit)
+        k >>= 1
+    return digits
+
+
+def square_root_mod_prime(a, p):
+    """ Returns some r such that r^2 = a (mod p), for p prime, or None if a is not a quadratic residue mod p. """
+    a %= p
+    if a == 0 or p == 2:
+        return a
+    if pow(a, (p - 1) // 2, p) != 1:    # Euler's criterion
+        return None
+    if p % 4 == 3:
+        return pow(a, (p + 1) // 4, p)
+    # Tonelli-Shanks: write p - 1 = q · 2^s, with q odd, and find a quadratic non-residue z
+    q, s = p - 1, 0
+    while q % 2 == 0:
+        q, s = q // 2, s + 1
+    z = 2
+    while pow(z, (p - 1) // 2, p) != p - 1:
+        z += 1
+    m, c, t, r = s, pow(z, q, p), pow(a, q, p), pow(a, (q + 1) // 2, p)
+    while t != 1:
+        # Find the least i such that t^(2^i) = 1
+        i, t_squared = 0, t
+        while t_squared != 1:
+            i, t_squared = i + 1, t_squared * t_squared % p
+        b = pow(c, 1 << (m - i - 1), p)
+        m, c = i, b * b % p
+        t, r = t * c % p, r * b % p
+    return r
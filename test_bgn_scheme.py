@@ -0,0 +1,31 @@
+import pickle
+
+from bgn.keygen import PublicKey, keygen
+from bgn.scheme import (add, decode_ciphertexts, decrypt, decrypt_batch, encode_ciphertexts, encrypt, encrypt_batch,
+                        multiply, multiply_batch)
+
+if __name__ == '__main__':
+    pk, sk = keygen(bits_of_security=16)
+    bound = 2 ** 7     # Products of messages must stay below q2 (> 2^16)
+
+    C1, C2 = encrypt(pk, 5), encrypt(pk, 7)
+    assert decrypt(pk, sk, C1, bound=bound) == 5
+    assert decrypt(pk, sk, add(pk, C1, C2), bound=bound) == 12
+    D = multiply(pk, C1, C2)
+    assert decrypt(pk, sk, D, bound=bound ** 2) == 35
+    assert decrypt(pk, sk, add(pk, D, multiply(pk, C2, C2)), bound=bound ** 2) == 35 + 49
+
+    messages = list(range(0, bound, 3))
+    ciphertexts = encrypt_batch(pk, messages)
+    assert decrypt_batch(pk, sk, ciphertexts, bound=bound) == messages
+    products = multiply_batch(pk, [(C2, C) for C in ciphertexts])
+    assert decrypt_batch(pk, sk, products, bound=bound ** 2) == [7 * m for m in messages]
+
+    # Serialization of keys and ciphertexts
+    restored = PublicKey.from_bytes(pk.to_bytes())
+    assert pickle.loads(pickle.dumps(pk)).to_bytes() == pk.to_bytes()
+    assert decrypt(restored, sk, encrypt(restored, 9), bound=bound) == 9
+    buffer = encode_ciphertexts(pk, ciphertexts)
+    assert len(buffer) == len(ciphertexts) * pk.curve.point_size(compressed=True)
+    assert decrypt_batch(restored, sk, decode_ciphertexts(restored, buffer), bound=bound) == messages
+    assert decode_ciphertexts(pk, encode_ciphertexts(pk, products), in_G1=True) == products
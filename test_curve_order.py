@@ -0,0 +1,16 @@
+from curves.curves import WeierstrassCurve
+from fields.extension import FiniteFieldExtension3thPrimitiveRoot
+from fields.primeorder import FiniteFieldPrimeOrder
+
+if __name__ == '__main__':
+    # Fields above COUNTING_THRESHOLD, so that order() uses Mestre's method (random points of the curve and its twist)
+    for a, b, p in [(3, 7, 10007), (1, 1, 10009), (2, 5, 9973), (5, 0, 10009), (0, 3, 10039)]:
+        curve = WeierstrassCurve(a=a, b=b, field=FiniteFieldPrimeOrder(prime=p))
+        assert curve.order() == curve._count_points(), f'Wrong order for {curve}'
+    # Curve over F_101(α) which is not defined over F_101
+    field = FiniteFieldExtension3thPrimitiveRoot(prime=101)
+    curve = WeierstrassCurve(a=field.from_coefficients(2, 3), b=field.from_coefficients(5, 1), field=field)
+    assert curve.order() == curve._count_points(), f'Wrong order for {curve}'
+    # Singular curve, where the Hasse bound does not hold
+    curve = WeierstrassCurve(a=0, b=0, field=FiniteFieldPrimeOrder(prime=10009))
+    assert curve.order() == curve._count_points() == 10009 + 1
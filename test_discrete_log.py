@@ -0,0 +1,39 @@
+from curves.curves import WeierstrassCurve
+from curves.finitegroup import FiniteGroup
+from fields.primeorder import FiniteFieldPrimeOrder
+
+if __name__ == '__main__':
+    # Points of y^2 = x^3 + 3x + 7 over F_1009
+    curve = WeierstrassCurve(a=3, b=7, field=FiniteFieldPrimeOrder(prime=1009))
+    group = curve.as_group()
+    P = curve.random_point()
+    n = group.order(P)
+    for k in [0, 1, 2, n // 2, n - 1]:
+        assert group.discrete_log(P, k * P) == k                                 # Pohlig-Hellman
+        assert group.discrete_log(P, k * P, bound=n) == k                        # Baby-step giant-step
+        assert group.discrete_log(P, k * P, bound=n, method='kangaroo') == k    # Pollard's kangaroo
+    group.RHO_THRESHOLD = 2     # Force Pollard's rho for every prime factor
+    assert group.discrete_log(P, 123 * P) == 123 % n
+
+    # Multiplicative group of F_1000003, with a baby-step table for exponents up to 2^12 built once
+    field = FiniteFieldPrimeOrder(prime=1000003)
+    group = FiniteGroup(
+        group_elements=lambda: (x for x in field.field_elements() if x != 0),   # Never enumerated
+        identity_element=field.one,
+        operation=lambda a, b: a * b,
+        inverse=lambda a: 1 / a,
+        order=field.order() - 1,
+    )
+    g = field.multiplicative_generator()
+    for k in range(0, 2 ** 12, 97):
+        assert group.discrete_log(g, g ** k, bound=2 ** 12, table_size=2 ** 12) == k
+    try:
+        group.discrete_log(g, g ** 5000, bound=2 ** 12)
+        raise AssertionError('Expected no discrete logarithm in [0, 2^12)')
+    except ValueError:
+        pass
+    try:
+        group.discrete_log(g, g, bound=0)
+        raise AssertionError('Expected an empty range of exponents to be rejected')
+    except ValueError:
+        pass
@@ -0,0 +1,18 @@
+import random
+
+from curves.curves import WeierstrassCurve
+from fields.primeorder import FiniteFieldPrimeOrder
+
+if __name__ == '__main__':
+    curve = WeierstrassCurve(a=3, b=7, field=FiniteFieldPrimeOrder(prime=10007))
+    for size in [1, 5, curve.PIPPENGER_THRESHOLD - 1, curve.PIPPENGER_THRESHOLD, 3 * curve.PIPPENGER_THRESHOLD]:
+        points = [curve.random_point() for _ in range(size - 1)] + [curve.neutral_element()]
+        scalars = [random.randrange(-2 ** 40, 2 ** 40) for _ in range(size)]
+        scalars[0] = 0
+        if size > 2:
+            scalars[1], scalars[2] = -1, -random.randrange(2 ** 64)
+        expected = curve.neutral_element()
+        for P, k in zip(points, scalars):
+            expected = expected + k * P
+        assert curve.multi_scalar_mul(points, scalars) == expected, f'Wrong sum of {size} terms'
+    assert curve.multi_scalar_mul([], []) == curve.neutral_element()
@@ -0,0 +1,31 @@
+from bgn.keygen import modified_tate_pairing
+from curves.curves import WeierstrassCurve
+from curves.weil import multi_pairing, tate_pairing
+from fields.extension import FiniteFieldExtension3thPrimitiveRoot
+from fields.primeorder import FiniteFieldPrimeOrder
+
+if __name__ == '__main__':
+    # Supersingular curve y^2 = x^3 + 1 over F_29, with 5 | 29 + 1, and distortion map into F_29(α)
+    field = FiniteFieldPrimeOrder(prime=29)
+    curve = WeierstrassCurve(a=0, b=1, field=field)
+    field_Fp2 = FiniteFieldExtension3thPrimitiveRoot(prime=29)
+    curve_Fp2 = WeierstrassCurve(a=0, b=1, field=field_Fp2)
+    P = curve.point(4, 6)
+    assert 5 * P == curve.neutral_element() and P != curve.neutral_element()
+    t = modified_tate_pairing(curve_Fp2, P, P, n=5)
+    assert t != 1 and t ** 5 == 1, f'modified_tate_pairing(P, P, n=5) = {t} (but expected a primitive 5-th root of unity)'
+    for a in range(1, 5):
+        for b in range(1, 5):
+            assert modified_tate_pairing(curve_Fp2, a * P, b * P, n=5) == t ** (a * b)
+
+    # Without the distortion map, the pairing is trivial on points of E(F_p) (even for Q in <P>)
+    P_Fp2 = curve_Fp2.point(4, 6)
+    assert tate_pairing(P_Fp2, P_Fp2, n=5) == 1 and tate_pairing(P_Fp2, 2 * P_Fp2, n=5) == 1
+    distorted = curve_Fp2.point(field_Fp2.from_coefficients(0, 4), 6)     # Distortion map (x, y) -> (α·x, y)
+    assert multi_pairing([(P_Fp2, P_Fp2), (P_Fp2, distorted)], n=5, pairing='tate') == t
+
+    # Bilinearity on E(F_p(α)) (embedding degree 1), which needs an auxiliary point S
+    points = [Q for Q in curve_Fp2.get_all_points() if 6 * Q == curve_Fp2.neutral_element()]
+    P, Q, R = points[3], points[7], points[11]
+    assert tate_pairing(P + R, Q, n=6) == tate_pairing(P, Q, n=6) * tate_pairing(R, Q, n=6)
+    assert tate_pairing(P, Q + R, n=6) == tate_pairing(P, Q, n=6) * tate_pairing(P, R, n=6)